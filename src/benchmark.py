@@ -0,0 +1,178 @@
+"""
+Benchmarks the mod manager against fake_repo, a local stand-in for the mod repository, so it doesn't depend on GitHub.
+Results are saved as JSON and compared with the previous run to flag regressions.
+Run with `python benchmark.py --mods 100 --latency 0.02`
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable
+
+from cache import load_json, save_json
+from fake_repo import FakeRepo, fake_game_dir
+from utils import local_path
+
+DEFAULT_OUTPUT = local_path("data", "cache", "benchmark.json")
+
+
+class Benchmark:
+    """Something to time. setup runs before every run and isn't timed."""
+
+    def __init__(self, name: str, run: Callable[[], Any], setup: Callable[[], Any] | None = None) -> None:
+        self.name = name
+        self.run = run
+        self.setup = setup
+
+    def time(self, repeat: int) -> list[float]:
+        timings = []
+        for _ in range(repeat):
+            if self.setup:
+                self.setup()
+            start = time.perf_counter()
+            self.run()
+            timings.append(time.perf_counter() - start)
+        return timings
+
+
+def make_benchmarks(repo: FakeRepo, work_dir: str, mod_count: int, workers: int) -> list[Benchmark]:
+    from config import validate_file_path
+    from mods import build_mod_data
+    from utils import get_available_mods, get_remote_mod_version, get_remote_mod_versions, install_bepin, install_mod
+
+    game_dir = fake_game_dir(work_dir)
+    bepinex_dir = os.path.join(work_dir, "bepinex")
+    exe_path = os.path.join(work_dir, "game.exe")
+
+    def per_mod_layout() -> None:
+        repo.aggregated = False
+        repo.clear_cache()
+
+    def aggregated_layout() -> None:
+        repo.aggregated = True
+        repo.clear_cache()
+
+    def warm_catalog() -> None:
+        # a no-op after the first run, the catalog stays fresh in the http cache
+        repo.aggregated = True
+        build_mod_data(game_dir)
+
+    def install_old_version() -> None:
+        old = repo.versions(1)[1]
+        install_mod(game_dir, "Fake Mod 1", old["download_url"], old["sha256"], mod_uuid=repo.mod_uuid(1),
+                    mod_version="1.0.0")
+
+    def update_mod(delta: bool) -> None:
+        latest = repo.versions(1)[0]
+        install_mod(game_dir, "Fake Mod 1", latest["download_url"], latest["sha256"], mod_uuid=repo.mod_uuid(1),
+                    mod_version="1.1.0", files=latest["files"] if delta else None)
+
+    def touch_exe() -> None:
+        # a new mtime is all it takes to miss the validation cache
+        with open(exe_path, "wb") as f:
+            f.write(os.urandom(8 * 1024 * 1024))
+
+    benchmarks = [
+        Benchmark("remote_versions_serial",
+                  lambda: [get_remote_mod_version(data) for data in get_available_mods().values()], per_mod_layout),
+        Benchmark("remote_versions_concurrent",
+                  lambda: get_remote_mod_versions(get_available_mods(), max_workers=workers), per_mod_layout),
+        Benchmark("build_mod_data_cold", lambda: build_mod_data(game_dir), per_mod_layout),
+        Benchmark("build_mod_data_catalog_cold", lambda: build_mod_data(game_dir), aggregated_layout),
+        Benchmark("build_mod_data_warm", lambda: build_mod_data(game_dir), warm_catalog),
+        Benchmark("install_mod", lambda: install_mod(game_dir, "Fake Mod 0", f"{repo.url}/mods/0/mod.zip",
+                                                     repo.versions(0)[0]["sha256"], mod_uuid=repo.mod_uuid(0),
+                                                     mod_version="1.1.0")),
+        Benchmark("update_mod_full", lambda: update_mod(False), install_old_version),
+        Benchmark("update_mod_delta", lambda: update_mod(True), install_old_version),
+        Benchmark("install_bepin", lambda: install_bepin(bepinex_dir), repo.clear_cache),
+        Benchmark("validate_file_path_cold", lambda: validate_file_path(exe_path), touch_exe),
+        Benchmark("validate_file_path_warm", lambda: validate_file_path(exe_path)),
+    ]
+    # kivy would otherwise try to parse the benchmark's arguments as its own, and take over logging
+    os.environ.setdefault("KIVY_NO_ARGS", "1")
+    os.environ.setdefault("KIVY_LOG_MODE", "PYTHON")
+    try:
+        from kvui import ChauffeurApp
+    except ImportError as e:
+        print(f"Skipping check_mods_rows, the app can't be imported ({e})", file=sys.stderr)
+    else:
+        # the part of check_mods that scales with the catalog: turning every mod into RecycleView rows
+        app = ChauffeurApp()
+        app.selected_mods = set()
+        available: list = []
+
+        def load_mods() -> None:
+            repo.aggregated = True
+            available[:] = build_mod_data(game_dir)[1]
+
+        benchmarks.append(Benchmark("check_mods_rows", lambda: [app.mod_row(mod) for mod in available], load_mods))
+    return benchmarks
+
+
+def compare(results: dict[str, dict], previous: dict[str, dict], threshold: float) -> list[str]:
+    """Get the benchmarks whose median got slower than threshold allows since the previous run"""
+    regressions = []
+    for name, result in results.items():
+        if name not in previous:
+            continue
+        before, after = previous[name]["median"], result["median"]
+        # ignore noise on things that only take a moment
+        if after > before * (1 + threshold) and after - before > 1.0:
+            regressions.append(f"{name}: {before:.1f} ms -> {after:.1f} ms (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mods", type=int, default=100, help="Number of fake mods in the catalog.")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds of latency injected per request.")
+    parser.add_argument("--bandwidth", type=int, default=0, help="Bytes per second per response, 0 for unlimited.")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Chance of a request failing with a 503.")
+    parser.add_argument("--asset-size", type=int, default=64 * 1024, help="Size of each fake mod's dll in bytes.")
+    parser.add_argument("--workers", type=int, default=8, help="Worker threads for the concurrent fetch.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of each benchmark. The median is what's compared.")
+    parser.add_argument("--only", nargs="*", default=[], help="Only run benchmarks with these names.")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to save the results.")
+    parser.add_argument("--baseline", help="Results to compare against. Defaults to the previous run at --output.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="How much slower counts as a regression.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    config = {key: getattr(args, key) for key in ("mods", "latency", "bandwidth", "failure_rate", "asset_size",
+                                                    "workers")}
+    previous = load_json(args.baseline or args.output, {})
+    results: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as work_dir, FakeRepo(args.mods, args.latency, args.bandwidth,
+                                                             args.failure_rate, args.asset_size) as repo:
+        for benchmark in make_benchmarks(repo, work_dir, args.mods, args.workers):
+            if args.only and benchmark.name not in args.only:
+                continue
+            repo.requests = 0
+            timings = [seconds * 1000 for seconds in benchmark.time(args.repeat)]
+            results[benchmark.name] = {
+                "median": statistics.median(timings),
+                "min": min(timings),
+                "runs": len(timings),
+                "requests": repo.requests / len(timings),
+            }
+            print(f"{benchmark.name:30} {results[benchmark.name]['median']:10.1f} ms "
+                  f"(min {min(timings):.1f} ms, {repo.requests / len(timings):.0f} requests)")
+
+    status = 0
+    if previous.get("config") == config:
+        regressions = compare(results, previous.get("results", {}), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        status = 1 if regressions else 0
+    elif previous:
+        print("Previous results used different settings, not comparing.")
+    save_json(args.output, {"time": time.time(), "config": config, "results": results})
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
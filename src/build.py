@@ -14,11 +14,17 @@ from utils import __version__
 
 build_folder = Path("build", f"exe.{sysconfig.get_platform()}-{sysconfig.get_python_version()}")
 
-exes = [cx_Freeze.Executable(
-    script="main.py",
-    target_name="Chauffeur Mod Manager.exe",
-    base="Win32GUI",
-)]
+exes = [
+    cx_Freeze.Executable(
+        script="main.py",
+        target_name="Chauffeur Mod Manager.exe",
+        base="Win32GUI",
+    ),
+    cx_Freeze.Executable(
+        script="cli.py",
+        target_name="chauffeur-cli.exe",
+    ),
+]
 
 extra_data = ["data"]
 
@@ -64,8 +70,9 @@ cx_Freeze.setup(
     executables=exes,
     options={
         "build_exe": {
-            "packages": ["kivy", "kivymd"],
-            "excludes": ["numpy, Cython", "PySide2", "PIL", "pandas"],
+            # PIL loads its image plugins dynamically, so it has to be included whole for icons.make_thumbnail
+            "packages": ["kivy", "kivymd", "PIL"],
+            "excludes": ["numpy, Cython", "PySide2", "pandas"],
             "optimize": 1,
             "build_exe": build_folder,
             "include_files": [],
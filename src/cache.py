@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Mapping, NamedTuple
+
+
+def load_json(path: str, default: Any = None) -> Any:
+    """Load a json file, returning `default` if it's missing or unreadable"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_json(path: str, data: Any) -> None:
+    """Atomically write data to a json file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+
+class CacheEntry(NamedTuple):
+    key: str
+    etag: str
+    last_modified: str
+    fetched: float
+    accessed: float
+    size: int
+
+
+class HTTPCache:
+    """
+    On-disk cache of response bodies keyed by url. Entries are fresh for `ttl` seconds, after which they should be
+    revalidated with the headers from `conditional_headers`. Least recently used entries are evicted once the cache
+    grows past `max_size` bytes. Reads only update the access times in memory, call `save` after a batch of them.
+    """
+    index_name = "index.json"
+
+    def __init__(self, directory: str, ttl: float = 3600, max_size: int = 50 * 1024 * 1024,
+                 offline: bool = False) -> None:
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size = max_size
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._entries: dict[str, CacheEntry] | None = None
+        # access times changed since the index was last written
+        self._dirty = False
+
+    @property
+    def entries(self) -> dict[str, CacheEntry]:
+        if self._entries is None:
+            index = load_json(os.path.join(self.directory, self.index_name), {})
+            self._entries = {}
+            for url, entry in index.items():
+                try:
+                    self._entries[url] = CacheEntry(**entry)
+                except TypeError:
+                    continue
+        return self._entries
+
+    def _save_index(self) -> None:
+        save_json(os.path.join(self.directory, self.index_name),
+                  {url: entry._asdict() for url, entry in self.entries.items()})
+        self._dirty = False
+
+    def save(self) -> None:
+        """Write access times from reads since the last write"""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, url: str) -> CacheEntry | None:
+        with self._lock:
+            entry = self.entries.get(url)
+            if entry and not os.path.isfile(self._body_path(entry.key)):
+                del self.entries[url]
+                return None
+            return entry
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return time.time() - entry.fetched < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry: CacheEntry | None) -> dict[str, str]:
+        headers = {}
+        if entry:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def read(self, url: str) -> bytes:
+        """Read the cached body for url, marking it as recently used"""
+        with self._lock:
+            entry = self.entries[url]
+            self.entries[url] = entry._replace(accessed=time.time())
+            self._dirty = True
+            with open(self._body_path(entry.key), "rb") as f:
+                return f.read()
+
+    def revalidated(self, url: str, headers: Mapping[str, str]) -> None:
+        """Mark the entry for url as fresh again after a 304 response"""
+        with self._lock:
+            entry = self.entries[url]
+            self.entries[url] = entry._replace(
+                etag=headers.get("ETag", entry.etag),
+                last_modified=headers.get("Last-Modified", entry.last_modified),
+                fetched=time.time(),
+            )
+            self._save_index()
+
+    def store(self, url: str, body: bytes, headers: Mapping[str, str]) -> None:
+        key = hashlib.sha256(url.encode()).hexdigest()
+        now = time.time()
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = f"{self._body_path(key)}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(body)
+            os.replace(temp_path, self._body_path(key))
+            self.entries[url] = CacheEntry(
+                key,
+                headers.get("ETag", ""),
+                headers.get("Last-Modified", ""),
+                now,
+                now,
+                len(body),
+            )
+            self._evict()
+            self._save_index()
+
+    def _evict(self) -> None:
+        total = sum(entry.size for entry in self.entries.values())
+        for url, entry in sorted(self.entries.items(), key=lambda item: item[1].accessed):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(self._body_path(entry.key))
+            except FileNotFoundError:
+                pass
+            del self.entries[url]
+            total -= entry.size
+
+    def clear(self) -> None:
+        with self._lock:
+            for entry in self.entries.values():
+                try:
+                    os.remove(self._body_path(entry.key))
+                except FileNotFoundError:
+                    pass
+            self.entries.clear()
+            self._save_index()
+
+
+class VersionIndex:
+    """
+    Persistent map of file path to version, keyed on the file's size and mtime so unchanged files are never read
+    again. Call `save` after a batch of lookups to persist new entries.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, list] | None = None
+        self._dirty = False
+
+    @property
+    def entries(self) -> dict[str, list]:
+        if self._entries is None:
+            self._entries = load_json(self.path, {})
+        return self._entries
+
+    def get(self, file_path: str, read_version: Callable[[str], str]) -> str:
+        """Get the version of file_path, calling read_version only if the file changed since it was last indexed"""
+        stat = os.stat(file_path)
+        with self._lock:
+            entry = self.entries.get(file_path)
+            if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+                return entry[2]
+        version = read_version(file_path)
+        with self._lock:
+            self.entries[file_path] = [stat.st_size, stat.st_mtime_ns, version]
+            self._dirty = True
+        return version
+
+    def discard(self, file_path: str) -> None:
+        with self._lock:
+            if self.entries.pop(file_path, None):
+                self._dirty = True
+
+    def discard_folder(self, folder: str) -> None:
+        """Forget every file under folder, for when it's removed"""
+        prefix = os.path.join(folder, "")
+        with self._lock:
+            for file_path in [file_path for file_path in self.entries if file_path.startswith(prefix)]:
+                del self.entries[file_path]
+                self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if self._dirty:
+                save_json(self.path, self.entries)
+                self._dirty = False
@@ -0,0 +1,358 @@
+"""
+Headless command line interface for scripted installs, built on the same core as the app but without importing kivy.
+Run with `python cli.py --help`
+"""
+import argparse
+import configparser
+import json
+import os
+import sys
+
+from config import validate_file_path
+from manifests import get_manifests, uninstall_mod, verify_mod
+from mods import ModEntry, build_mod_data
+from profiles import apply_profile, delete_profile, get_profiles, prune_store, rollback_mod, save_profile
+from resolver import ResolveError, install_chauffeur, install_plan, plan_install
+from utils import (
+    __version__, chauffeur_installed, get_available_mods, get_catalog, get_installed_mod_version, get_installed_mods,
+    get_remote_mod_versions, http_cache, install_mod, local_path, set_mirror,
+)
+
+
+def read_config() -> configparser.ConfigParser:
+    config = configparser.ConfigParser()
+    config.read(local_path("data", "chauffeur.ini"))
+    return config
+
+
+def default_game_paths() -> list[str]:
+    """Use the game path the app is configured with if none are given"""
+    path = read_config().get("configuration", "path", fallback='""').strip('"')
+    return [path] if path else []
+
+
+def game_dir_from_path(path: str) -> str:
+    """Game paths can be either the game folder or the executable in it"""
+    return os.path.dirname(os.path.abspath(path)) if os.path.isfile(path) else os.path.abspath(path)
+
+
+def print_progress(done: int, total: int) -> None:
+    print(f"\r  {done}/{total}", end="" if done < total else "\n", flush=True)
+
+
+def find_mods(mods: list[ModEntry], names: list[str]) -> list[ModEntry]:
+    """Look mods up by uuid or name"""
+    found = []
+    for name in names:
+        for mod in mods:
+            if name == mod.uuid or name.lower() == mod.name.lower():
+                found.append(mod)
+                break
+        else:
+            raise SystemExit(f"Unknown mod {name}")
+    return found
+
+
+def require_chauffeur(game_dir: str) -> bool:
+    if chauffeur_installed(game_dir):
+        return True
+    print(f"Chauffeur is not installed in {game_dir}. Run setup first.", file=sys.stderr)
+    return False
+
+
+def install_with_dependencies(game_dir: str, mods: list[ModEntry], installed: list[ModEntry],
+                              available: list[ModEntry], jobs: int) -> int:
+    try:
+        plan = plan_install(game_dir, mods, available, installed)
+    except ResolveError as e:
+        print(e, file=sys.stderr)
+        return 1
+    extra = [mod.name for mod in plan.mods if mod not in mods]
+    if extra:
+        print(f"Also installing dependencies: {', '.join(extra)}")
+    return report_errors(install_plan(game_dir, plan, jobs, print_progress), plan.mods)
+
+
+def report_errors(errors: dict[str, Exception], mods: list[ModEntry]) -> int:
+    for mod in mods:
+        if mod.uuid in errors:
+            print(f"Failed to install {mod.name}: {errors[mod.uuid]}", file=sys.stderr)
+        else:
+            print(f"Installed {mod.name} {mod.latest_version}")
+    return 1 if errors else 0
+
+
+def cmd_setup(game_dir: str, args: argparse.Namespace) -> int:
+    try:
+        install_chauffeur(game_dir, set_stage=print)
+    except Exception as e:
+        # a failed folder shouldn't stop the rest of the --game folders
+        print(f"Failed to install Chauffeur in {game_dir}: {e}", file=sys.stderr)
+        return 1
+    print("Chauffeur installed.")
+    return 0
+
+
+def cmd_list(game_dir: str, args: argparse.Namespace) -> int:
+    if not require_chauffeur(game_dir):
+        return 1
+    installed, available = build_mod_data(game_dir)
+    for mod in installed:
+        if args.outdated and not mod.outdated:
+            continue
+        update = f" -> {mod.latest_version}" if mod.outdated else ""
+        print(f"[installed] {mod.uuid}  {mod.name} {mod.installed_version}{update}")
+    if not args.installed and not args.outdated:
+        for mod in available:
+            print(f"[available] {mod.uuid}  {mod.name} {mod.latest_version}")
+    return 0
+
+
+def cmd_install(game_dir: str, args: argparse.Namespace) -> int:
+    if not require_chauffeur(game_dir):
+        return 1
+    installed, available = build_mod_data(game_dir)
+    mods = find_mods(installed + available, args.mods)
+    return install_with_dependencies(game_dir, mods, installed, available, args.jobs)
+
+
+def cmd_update(game_dir: str, args: argparse.Namespace) -> int:
+    if not require_chauffeur(game_dir):
+        return 1
+    installed, available = build_mod_data(game_dir)
+    mods = find_mods(installed, args.mods) if args.mods else installed
+    mods = [mod for mod in mods if mod.outdated]
+    if not mods:
+        print("Everything is up to date.")
+        return 0
+    return install_with_dependencies(game_dir, mods, installed, available, args.jobs)
+
+
+def cmd_verify(game_dir: str, args: argparse.Namespace) -> int:
+    status = 0
+    game_exes = [file for file in os.listdir(game_dir) if file.endswith(".exe")] if os.path.isdir(game_dir) else []
+    if any(validate_file_path(os.path.join(game_dir, exe)) for exe in game_exes):
+        print("Game executable: ok")
+    else:
+        print("Game executable: not found or unsupported version")
+        status = 1
+    if not chauffeur_installed(game_dir):
+        print("Chauffeur: not installed")
+        return 1
+    print("Chauffeur: ok")
+    for mod_name in get_installed_mods(game_dir):
+        try:
+            version = get_installed_mod_version(mod_name, game_dir)
+        except (OSError, ValueError) as e:
+            print(f"{mod_name}: unable to read version ({e})")
+            status = 1
+            continue
+        problems = verify_mod(game_dir, mod_name)
+        print(f"{mod_name} {version}: {'; '.join(problems) if problems else 'ok'}")
+        if problems and problems != ["no install manifest"]:
+            status = 1
+    return status
+
+
+def cmd_uninstall(game_dir: str, args: argparse.Namespace) -> int:
+    installed = get_installed_mods(game_dir)
+    status = 0
+    for name in args.mods:
+        manifests = get_manifests(game_dir)
+        mod_name = next((mod_name for mod_name, manifest in manifests.items() if manifest.uuid == name), name)
+        if mod_name not in installed:
+            print(f"{name} is not installed", file=sys.stderr)
+            status = 1
+            continue
+        uninstall_mod(game_dir, mod_name)
+        print(f"Uninstalled {mod_name}")
+    return status
+
+
+def cmd_lock(game_dir: str, args: argparse.Namespace) -> int:
+    if not require_chauffeur(game_dir):
+        return 1
+    installed, available = build_mod_data(game_dir)
+    with open(args.lockfile, "w", encoding="utf-8") as f:
+        json.dump({"mods": {mod.uuid: mod.installed_version for mod in installed}}, f, indent=2)
+    print(f"Wrote {len(installed)} mods to {args.lockfile}")
+    return 0
+
+
+def cmd_sync(game_dir: str, args: argparse.Namespace) -> int:
+    with open(args.lockfile, "r", encoding="utf-8") as f:
+        locked: dict[str, str] = json.load(f)["mods"]
+    if not chauffeur_installed(game_dir) and cmd_setup(game_dir, args):
+        return 1
+    catalog = get_catalog()
+    index_data = catalog.index_data if catalog else get_available_mods()
+    missing = [uuid for uuid in locked if uuid not in index_data]
+    if missing:
+        print(f"Mods not in the catalog: {', '.join(missing)}", file=sys.stderr)
+        return 1
+    installed_names = get_installed_mods(game_dir)
+    to_install = {}
+    for uuid, version in locked.items():
+        name = index_data[uuid]["name"]
+        try:
+            if name in installed_names and get_installed_mod_version(name, game_dir) == version:
+                continue
+        except (OSError, ValueError):
+            # unreadable, so install it over whatever is there
+            pass
+        to_install[uuid] = index_data[uuid]
+    if not to_install:
+        print("Already in sync.")
+        return 0
+    status = 0
+    remote_versions = get_remote_mod_versions(to_install)
+    for uuid, mod_data in to_install.items():
+        name = mod_data["name"]
+        if uuid not in remote_versions:
+            print(f"Unable to fetch the versions of {name}", file=sys.stderr)
+            status = 1
+            continue
+        for version in remote_versions[uuid][1]:
+            if version["mod_version"] == locked[uuid]:
+                print(f"Installing {name} {version['mod_version']}")
+                try:
+                    install_mod(game_dir, name, version["download_url"], version["sha256"], print_progress, uuid,
+                                version["mod_version"], version.get("files"))
+                except Exception as e:
+                    print(f"Failed to install {name}: {e}", file=sys.stderr)
+                    status = 1
+                break
+        else:
+            print(f"{name} {locked[uuid]} is no longer available", file=sys.stderr)
+            status = 1
+    return status
+
+
+def cmd_profile(game_dir: str, args: argparse.Namespace) -> int:
+    if args.action == "list":
+        for name, profile in get_profiles().items():
+            print(f"{name}: {', '.join(sorted(profile)) or 'no mods'}")
+        return 0
+    if not args.name:
+        print(f"profile {args.action} needs a name", file=sys.stderr)
+        return 1
+    try:
+        if args.action == "save":
+            print(f"Saved {len(save_profile(game_dir, args.name))} mods to {args.name}")
+        elif args.action == "delete":
+            delete_profile(args.name)
+            print(f"Deleted {args.name}")
+        else:
+            installed, removed = apply_profile(game_dir, args.name)
+            for mod_name in removed:
+                print(f"Removed {mod_name}")
+            for mod_name in installed:
+                print(f"Installed {mod_name}")
+            print(f"Switched to {args.name}")
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+def cmd_rollback(game_dir: str, args: argparse.Namespace) -> int:
+    try:
+        package = rollback_mod(game_dir, args.mod, args.version)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"{args.mod} is now {package.version}")
+    return 0
+
+
+def cmd_prune(game_dirs: list[str], args: argparse.Namespace) -> int:
+    print(f"Removed {prune_store(game_dirs)} files from the mod store")
+    return 0
+
+
+def cmd_mirror(args: argparse.Namespace) -> int:
+    from mirror import MirrorServer
+    try:
+        server = MirrorServer(args.host, args.port)
+    except OSError as e:
+        print(f"Unable to listen on {args.host}:{args.port}: {e}", file=sys.stderr)
+        return 1
+    print(f"Mirroring on {server.url}, stop with Ctrl+C. Point other machines' mirror setting at this machine's "
+          f"address and port {server.server_address[1]}.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        http_cache.save()
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="chauffeur", description="Chauffeur Mod Manager command line interface.")
+    parser.add_argument("--version", action="version", version=__version__)
+    parser.add_argument("-g", "--game", action="append", default=[], metavar="PATH",
+                        help="Game folder or executable to work on. Can be given multiple times.")
+    parser.add_argument("-j", "--jobs", type=int, default=3, help="How many mods to download at once.")
+    parser.add_argument("--mirror", metavar="URL",
+                        help="LAN mirror to try before GitHub. Defaults to the app's mirror setting.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("setup", help="Install BepInEx and Chauffeur.").set_defaults(func=cmd_setup)
+    list_parser = commands.add_parser("list", help="List installed and available mods.")
+    list_parser.add_argument("--installed", action="store_true", help="Only list installed mods.")
+    list_parser.add_argument("--outdated", action="store_true", help="Only list installed mods with updates.")
+    list_parser.set_defaults(func=cmd_list)
+    install_parser = commands.add_parser("install", help="Install mods by uuid or name.")
+    install_parser.add_argument("mods", nargs="+")
+    install_parser.set_defaults(func=cmd_install)
+    update_parser = commands.add_parser("update", help="Update outdated mods, or all of them if none are given.")
+    update_parser.add_argument("mods", nargs="*")
+    update_parser.set_defaults(func=cmd_update)
+    uninstall_parser = commands.add_parser("uninstall", help="Uninstall mods by uuid or folder name.")
+    uninstall_parser.add_argument("mods", nargs="+")
+    uninstall_parser.set_defaults(func=cmd_uninstall)
+    commands.add_parser("verify", help="Check the game, Chauffeur and the files of installed mods.").set_defaults(
+        func=cmd_verify)
+    lock_parser = commands.add_parser("lock", help="Write the installed mod versions to a lockfile.")
+    lock_parser.add_argument("lockfile")
+    lock_parser.set_defaults(func=cmd_lock)
+    sync_parser = commands.add_parser("sync", help="Install the mod versions listed in a lockfile.")
+    sync_parser.add_argument("lockfile")
+    sync_parser.set_defaults(func=cmd_sync)
+    profile_parser = commands.add_parser("profile", help="Save, switch between and delete sets of installed mods.")
+    profile_parser.add_argument("action", choices=["list", "save", "apply", "delete"])
+    profile_parser.add_argument("name", nargs="?")
+    profile_parser.set_defaults(func=cmd_profile)
+    rollback_parser = commands.add_parser("rollback", help="Switch an installed mod to a previously installed version.")
+    rollback_parser.add_argument("mod", help="Mod folder name.")
+    rollback_parser.add_argument("--version", default="", help="Version to switch to. Defaults to the newest other one.")
+    rollback_parser.set_defaults(func=cmd_rollback)
+    commands.add_parser("prune", help="Remove stored mod versions no game folder or profile uses.")
+    mirror_parser = commands.add_parser("mirror", help="Serve the catalog and mod downloads to other machines.")
+    mirror_parser.add_argument("--host", default="0.0.0.0", help="Address to listen on.")
+    mirror_parser.add_argument("--port", type=int, default=8765)
+
+    args = parser.parse_args(argv)
+    if args.command == "mirror":
+        # doesn't work on a game folder
+        return cmd_mirror(args)
+    set_mirror(args.mirror if args.mirror is not None else read_config().get("network", "mirror_url", fallback=""))
+    game_paths = args.game or default_game_paths()
+    if not game_paths:
+        parser.error("No game path configured. Pass one with --game.")
+    if args.command == "prune":
+        # the store is shared, so everything installed in any of the game folders has to be kept at once
+        return cmd_prune([game_dir_from_path(game_path) for game_path in game_paths], args)
+    status = 0
+    for game_path in game_paths:
+        game_dir = game_dir_from_path(game_path)
+        if len(game_paths) > 1:
+            print(f"== {game_dir}")
+        status |= args.func(game_dir, args)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
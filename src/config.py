@@ -1,27 +1,65 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from cache import load_json, save_json
+from tracing import span
 from utils import local_path
 
+validation_lock = threading.Lock()
+VALIDATION_CACHE_PATH = local_path("data", "cache", "validated.json")
+
+
+def load_valid_hashes() -> dict[str, list[str]]:
+    """Load the known good hashes of the game executable, keyed by hashlib algorithm name"""
+    hashes = load_json(local_path("data", "valid-hashes.json"), {})
+    return {algorithm: [digest.lower() for digest in digests] for algorithm, digests in hashes.items()}
+
+
+def hash_file(path: str, algorithms: list[str]) -> dict[str, str]:
+    file_hashes = {algorithm: hashlib.new(algorithm) for algorithm in algorithms}
+    with span("hash", "hash", file=os.path.basename(path)) as trace, open(path, "rb", buffering=0) as f:
+        block = bytearray(64*1024)
+        view = memoryview(block)
+        while n := f.readinto(view):  # type: ignore
+            for file_hash in file_hashes.values():
+                file_hash.update(view[:n])
+        trace["bytes"] = f.tell()
+    return {algorithm: file_hash.hexdigest() for algorithm, file_hash in file_hashes.items()}
+
+
+def get_file_hashes(path: str, algorithms: list[str]) -> tuple[dict[str, str], bool]:
+    """
+    Get the hashes of a file, reusing the last result if its size, mtime and inode haven't changed since. Also returns
+    whether the result came from the cache.
+    """
+    stat = os.stat(path)
+    key = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+    with validation_lock:
+        cache = load_json(VALIDATION_CACHE_PATH, {})
+        entry = cache.get(path)
+        if entry and entry["key"] == key and all(algorithm in entry["hashes"] for algorithm in algorithms):
+            return entry["hashes"], True
+    file_hashes = hash_file(path, algorithms)
+    with validation_lock:
+        cache = load_json(VALIDATION_CACHE_PATH, {})
+        cache[path] = {"key": key, "hashes": file_hashes}
+        save_json(VALIDATION_CACHE_PATH, cache)
+    return file_hashes, False
+
 
 def validate_file_path(path: str) -> bool:
-    valid_md5s = ["6067fb82a0775112ecce3cc67d3206df"]
     if path == local_path():
         return False
+    start = time.perf_counter()
+    valid_hashes = load_valid_hashes()
     try:
-        with open(path, "rb", buffering=0) as f:
-            pos = f.tell()
-            from hashlib import md5
-            file_md5 = md5()
-            block = bytearray(64*1024)
-            view = memoryview(block)
-            while n := f.readinto(view):  # type: ignore
-                file_md5.update(view[:n])
-            file_md5_hex = file_md5.hexdigest()
-            for valid_md5 in valid_md5s:
-                if valid_md5.lower() == file_md5_hex:
-                    break
-            else:
-                raise ValueError(f"Invalid hash for {path}")
-            f.seek(pos)
-    except ValueError:
+        file_hashes, cached = get_file_hashes(path, list(valid_hashes))
+    except (OSError, ValueError):
         return False
-    else:
-        return True
+    valid = any(file_hashes[algorithm] in digests for algorithm, digests in valid_hashes.items())
+    logging.info(f"Validated {path} in {(time.perf_counter() - start) * 1000:.2f} ms "
+                 f"({'warm' if cached else 'cold'}). Valid: {valid}")
+    return valid
@@ -0,0 +1,81 @@
+"""
+Binary patches between two versions of a file, so an update that changed a few bytes of a dll doesn't need the whole
+dll. A patch is the header followed by a list of operations that build the new file:
+
+    C <offset u64> <length u32>   copy length bytes of the old file starting at offset
+    I <length u32> <data>         insert length bytes of data
+
+Patches carry no checksum of their own, the result is always checked against the new file's sha256.
+"""
+import hashlib
+import struct
+
+MAGIC = b"CHDELTA1"
+COPY = struct.Struct("<cQI")
+INSERT = struct.Struct("<cI")
+BLOCK_SIZE = 32
+
+
+class PatchError(ValueError):
+    pass
+
+
+def make_patch(old: bytes, new: bytes, block_size: int = BLOCK_SIZE) -> bytes:
+    """
+    Build a patch turning old into new. Matches are found on block_size aligned blocks of old and then extended
+    forwards, which is plenty for dlls where a release moves or rewrites a few regions.
+    """
+    blocks: dict[bytes, int] = {}
+    for offset in range(0, len(old) - block_size + 1, block_size):
+        blocks.setdefault(old[offset:offset + block_size], offset)
+    patch = [MAGIC]
+    literal_start = 0
+    i = 0
+    while i <= len(new) - block_size:
+        offset = blocks.get(new[i:i + block_size])
+        if offset is None:
+            i += 1
+            continue
+        length = block_size
+        while i + length < len(new) and offset + length < len(old) and new[i + length] == old[offset + length]:
+            length += 1
+        if literal_start < i:
+            patch.append(INSERT.pack(b"I", i - literal_start) + new[literal_start:i])
+        patch.append(COPY.pack(b"C", offset, length))
+        i += length
+        literal_start = i
+    if literal_start < len(new):
+        patch.append(INSERT.pack(b"I", len(new) - literal_start) + new[literal_start:])
+    return b"".join(patch)
+
+
+def apply_patch(old: bytes, patch: bytes, expected_hash: str = "") -> bytes:
+    """Rebuild the new file from old and a patch, raising PatchError if the patch is broken or the result is wrong"""
+    if not patch.startswith(MAGIC):
+        raise PatchError("Not a patch")
+    output = []
+    position = len(MAGIC)
+    try:
+        while position < len(patch):
+            operation = patch[position:position + 1]
+            if operation == b"C":
+                _, offset, length = COPY.unpack_from(patch, position)
+                position += COPY.size
+                if offset + length > len(old):
+                    raise PatchError("Patch copies past the end of the old file")
+                output.append(old[offset:offset + length])
+            elif operation == b"I":
+                _, length = INSERT.unpack_from(patch, position)
+                position += INSERT.size
+                if position + length > len(patch):
+                    raise PatchError("Patch is truncated")
+                output.append(patch[position:position + length])
+                position += length
+            else:
+                raise PatchError(f"Unknown patch operation {operation!r}")
+    except struct.error as e:
+        raise PatchError("Patch is truncated") from e
+    new = b"".join(output)
+    if expected_hash and hashlib.sha256(new).hexdigest() != expected_hash.lower():
+        raise PatchError("Patched file hash does not match expected")
+    return new
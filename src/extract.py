@@ -0,0 +1,114 @@
+"""
+Zip extraction shared by mod and BepInEx installs. Members are streamed to disk in chunks, spread over a thread pool for
+large archives, and skipped when the file on disk already has the same size and CRC.
+"""
+import os
+import shutil
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from zipfile import ZipFile, ZipInfo
+
+from tracing import span
+
+# archives with fewer members than this aren't worth the thread pool
+PARALLEL_THRESHOLD = 32
+
+
+def member_target(destination: str, member: ZipInfo, flatten: bool = False) -> str | None:
+    """
+    Get where a member should be extracted to, or None for directory entries. Raises ValueError for members that would
+    land outside of destination.
+    """
+    if member.is_dir():
+        return None
+    name = member.filename.replace("\\", "/")
+    if flatten:
+        name = name.split("/")[-1]
+    destination = os.path.abspath(destination)
+    target = os.path.abspath(os.path.join(destination, name))
+    if os.path.isabs(name) or os.path.commonpath([destination, target]) != destination or target == destination:
+        raise ValueError(f"Refusing to extract {member.filename} outside of {destination}")
+    return target
+
+
+def file_crc(path: str, chunk_size: int = 64 * 1024) -> int:
+    crc = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def member_unchanged(member: ZipInfo, target: str) -> bool:
+    try:
+        if os.path.getsize(target) != member.file_size:
+            return False
+        return file_crc(target) == member.CRC
+    except OSError:
+        return False
+
+
+def _extract_members(archive_path: str, members: list[tuple[ZipInfo, str]], chunk_size: int,
+                     on_member: Callable[[bool], None]) -> None:
+    # every worker gets its own handle, so seeks don't fight over one file position
+    with ZipFile(archive_path, "r") as zip_file:
+        for member, target in members:
+            if member_unchanged(member, target):
+                on_member(False)
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            temp_path = f"{target}.part"
+            with zip_file.open(member) as source_file, open(temp_path, "wb") as target_file:
+                shutil.copyfileobj(source_file, target_file, chunk_size)
+            os.replace(temp_path, target)
+            on_member(True)
+
+
+def extract_zip(
+        archive_path: str,
+        destination: str,
+        flatten: bool = False,
+        max_workers: int = 4,
+        chunk_size: int = 64 * 1024,
+        progress: Callable[[int, int], None] | None = None,
+        ) -> int:
+    """
+    Extract archive_path into destination, returning how many files were written. With flatten, the folder structure
+    of the archive is dropped and every file lands directly in destination.
+    """
+    with span("extract", "io", archive=os.path.basename(archive_path)) as trace:
+        with ZipFile(archive_path, "r") as zip_file:
+            # flattening can map several members to one target, keep the last like extracting in order would, so no
+            # two workers write the same file
+            targets: dict[str, tuple[ZipInfo, str]] = {}
+            for member in zip_file.infolist():
+                target = member_target(destination, member, flatten)
+                if target:
+                    targets[os.path.normcase(target)] = member, target
+            members = list(targets.values())
+        lock = threading.Lock()
+        counts = [0, 0]  # processed, written
+
+        def on_member(written: bool) -> None:
+            with lock:
+                counts[0] += 1
+                counts[1] += written
+                if progress:
+                    progress(counts[0], len(members))
+
+        workers = min(max_workers, len(members) // PARALLEL_THRESHOLD + 1)
+        if workers <= 1:
+            _extract_members(archive_path, members, chunk_size, on_member)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(_extract_members, archive_path, members[i::workers], chunk_size, on_member)
+                    for i in range(workers)
+                ]
+                for future in futures:
+                    future.result()
+        trace["files"] = len(members)
+        trace["written"] = counts[1]
+        return counts[1]
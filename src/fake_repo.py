@@ -0,0 +1,300 @@
+"""
+A local stand-in for the mod repository, GitHub releases and everything else utils downloads from, so installs and
+catalog refreshes can be benchmarked without the network. Everything it serves is generated from a seed, so runs are
+repeatable.
+
+    with FakeRepo(mod_count=200, latency=0.02) as repo:
+        build_mod_data(game_dir)
+"""
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import ModuleType
+
+import utils
+from cache import HTTPCache, VersionIndex
+from delta import make_patch
+from store import ModStore
+
+BEPINEX_ASSET = "BepInEx_win_x64_5.4.23.2.zip"
+
+
+class FakeRepoHandler(BaseHTTPRequestHandler):
+    server: "FakeRepo"
+
+    def do_GET(self) -> None:
+        self.server.requests += 1
+        time.sleep(self.server.latency)
+        if self.server.should_fail():
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        path = self.path.split("?")[0]
+        content = self.server.content(path)
+        if content is None:
+            self.send_error(404)
+            return
+        body, content_type = content
+        start = 0
+        match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if match and int(match.group(1)) < len(body):
+            start = int(match.group(1))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body) - start))
+        self.send_header("ETag", f'"{hashlib.md5(body).hexdigest()}"')
+        self.end_headers()
+        self.server.throttled_write(self.wfile, body[start:])
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class FakeRepo(ThreadingHTTPServer):
+    """
+    Serves a synthetic repo on localhost. latency is seconds slept per request, bandwidth is bytes per second per
+    response (0 for unlimited) and failure_rate is the chance of answering a request with a 503. With aggregated set the
+    repo also has a catalog.json, otherwise only the per mod versions manifests.
+    """
+    daemon_threads = True
+
+    def __init__(self, mod_count: int = 100, latency: float = 0.0, bandwidth: int = 0, failure_rate: float = 0.0,
+                 asset_size: int = 64 * 1024, aggregated: bool = False, seed: int = 0) -> None:
+        super().__init__(("127.0.0.1", 0), FakeRepoHandler)
+        self.mod_count = mod_count
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.failure_rate = failure_rate
+        self.asset_size = asset_size
+        self.aggregated = aggregated
+        self.seed = seed
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        # (module, name) -> value before patching
+        self._patched: dict[tuple[ModuleType, str], object] = {}
+        self._cache_dir: str | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def should_fail(self) -> bool:
+        with self._random_lock:
+            return self._random.random() < self.failure_rate
+
+    def throttled_write(self, output: io.BufferedIOBase, body: bytes, chunk_size: int = 16 * 1024) -> None:
+        if not self.bandwidth:
+            output.write(body)
+            return
+        for i in range(0, len(body), chunk_size):
+            chunk = body[i:i + chunk_size]
+            output.write(chunk)
+            time.sleep(len(chunk) / self.bandwidth)
+
+    def mod_uuid(self, i: int) -> str:
+        return f"00000000-0000-0000-0000-{i:012d}"
+
+    def index_entry(self, i: int) -> dict[str, str]:
+        return {
+            "name": f"Fake Mod {i}",
+            "description": f"Synthetic mod number {i} for benchmarking",
+            "author": f"author{i % 17}",
+            "homepage": f"{self.url}/mods/{i}",
+            "versions_url": f"{self.url}/mods/{i}/versions.json",
+        }
+
+    @lru_cache(maxsize=None)
+    def mod_files(self, i: int, version: str = "1.1.0") -> dict[str, bytes]:
+        """The files in a version of a mod. 1.1.0 only rewrites a small part of 1.0.0's dll, like a typical fix."""
+        dll = random.Random(self.seed * 100003 + i).randbytes(self.asset_size)
+        if version == "1.0.0":
+            middle = len(dll) // 2
+            dll = dll[:middle] + bytes(256) + dll[middle + 256:]
+        return {f"FakeMod{i}.dll": dll, "README.md": f"Fake mod {i}\n".encode()}
+
+    @lru_cache(maxsize=None)
+    def mod_asset(self, i: int, version: str = "1.1.0") -> bytes:
+        data = io.BytesIO()
+        with zipfile.ZipFile(data, "w") as archive:
+            for name, content in self.mod_files(i, version).items():
+                archive.writestr(name, content)
+        return data.getvalue()
+
+    @lru_cache(maxsize=None)
+    def mod_patch(self, i: int, old_version: str, version: str, name: str) -> bytes | None:
+        old, new = self.mod_files(i, old_version).get(name), self.mod_files(i, version).get(name)
+        return None if old is None or new is None else make_patch(old, new)
+
+    def file_manifest(self, i: int, version: str, previous: str = "") -> dict[str, dict]:
+        """The published files of a version, with patches from the previous version's files where they changed"""
+        old_files = self.mod_files(i, previous) if previous else {}
+        files = {}
+        for name, content in self.mod_files(i, version).items():
+            sha256 = hashlib.sha256(content).hexdigest()
+            files[name] = {"size": len(content), "sha256": sha256, "url": f"{self.url}/mods/{i}/{version}/files/{name}"}
+            old = old_files.get(name)
+            if old is not None and old != content:
+                files[name]["patches"] = {
+                    hashlib.sha256(old).hexdigest(): f"{self.url}/mods/{i}/{version}/patches/{previous}/{name}",
+                }
+        return files
+
+    def versions(self, i: int) -> list[dict[str, object]]:
+        return [{
+            "mod_version": "1.1.0",
+            "download_url": f"{self.url}/mods/{i}/mod.zip",
+            "sha256": hashlib.sha256(self.mod_asset(i)).hexdigest(),
+            "files": self.file_manifest(i, "1.1.0", "1.0.0"),
+            "changelog": [f"Fixed fake bug {i}"],
+        }, {
+            "mod_version": "1.0.0",
+            "download_url": f"{self.url}/mods/{i}/1.0.0/mod.zip",
+            "sha256": hashlib.sha256(self.mod_asset(i, "1.0.0")).hexdigest(),
+            "files": self.file_manifest(i, "1.0.0"),
+            "changelog": ["Initial release"],
+        }]
+
+    @lru_cache(maxsize=None)
+    def bepinex_asset(self) -> bytes:
+        data = io.BytesIO()
+        with zipfile.ZipFile(data, "w") as archive:
+            archive.writestr("winhttp.dll", random.Random(self.seed).randbytes(self.asset_size))
+            archive.writestr("doorstop_config.ini", "[General]\nenabled=true\n")
+            for name in ("BepInEx.dll", "BepInEx.Preloader.dll", "0Harmony.dll", "Mono.Cecil.dll"):
+                archive.writestr(f"BepInEx/core/{name}", random.Random(name).randbytes(self.asset_size))
+        return data.getvalue()
+
+    def content(self, path: str) -> tuple[bytes, str] | None:
+        """Get the body and content type served at path"""
+        def as_json(data: object) -> tuple[bytes, str]:
+            return json.dumps(data).encode(), "application/json"
+
+        if path == "/available-mods.json":
+            return as_json({self.mod_uuid(i): self.index_entry(i) for i in range(self.mod_count)})
+        if path == "/catalog.json" and self.aggregated:
+            mods = {}
+            for i in range(self.mod_count):
+                latest = dict(self.versions(i)[0])
+                del latest["changelog"]
+                mods[self.mod_uuid(i)] = {**self.index_entry(i), "latest": latest}
+            return as_json({"revision": str(self.seed), "mods": mods})
+        if path == "/bepinex/releases":
+            asset = {"name": BEPINEX_ASSET, "browser_download_url": f"{self.url}/bepinex/{BEPINEX_ASSET}"}
+            return as_json([
+                {"tag_name": "v6.0.0-pre.2", "prerelease": True, "assets": []},
+                {"tag_name": "v5.4.23.2", "prerelease": False, "assets": [
+                    {"name": "BepInEx_win_x86_5.4.23.2.zip", "browser_download_url": ""}, asset,
+                ]},
+            ])
+        if path == f"/bepinex/{BEPINEX_ASSET}":
+            return self.bepinex_asset(), "application/zip"
+        if path in ("/MMHOOK.zip", "/Chauffeur.dll"):
+            return self.mod_asset(-1 if path == "/MMHOOK.zip" else -2), "application/octet-stream"
+        match = re.fullmatch(r"/mods/(\d+)/(versions\.json|mod\.zip)", path)
+        if match and int(match.group(1)) < self.mod_count:
+            i = int(match.group(1))
+            if match.group(2) == "mod.zip":
+                return self.mod_asset(i), "application/zip"
+            return as_json({"versions": self.versions(i)})
+        match = re.fullmatch(r"/mods/(\d+)/(1\.[01]\.0)/(mod\.zip|files/(.+)|patches/(1\.[01]\.0)/(.+))", path)
+        if match and int(match.group(1)) < self.mod_count:
+            i, version = int(match.group(1)), match.group(2)
+            if match.group(3) == "mod.zip":
+                return self.mod_asset(i, version), "application/zip"
+            if match.group(4):
+                content = self.mod_files(i, version).get(match.group(4))
+                return None if content is None else (content, "application/octet-stream")
+            patch = self.mod_patch(i, match.group(5), version, match.group(6))
+            return None if patch is None else (patch, "application/octet-stream")
+        return None
+
+    def patch(self) -> None:
+        """
+        Point utils at this repo, with an empty http cache, mod store, version index and validation cache of its own,
+        so nothing it does touches the app's data folder
+        """
+        import config
+        import mods
+        import profiles
+        import resolver
+        import watcher
+        self._cache_dir = tempfile.mkdtemp(prefix="fake-repo-cache-")
+        version_index = VersionIndex(os.path.join(self._cache_dir, "versions.json"))
+        mod_store = ModStore(os.path.join(self._cache_dir, "store"))
+        replacements = {
+            (utils, "AVAILABLE_MODS_URL"): f"{self.url}/available-mods.json",
+            (utils, "CATALOG_URL"): f"{self.url}/catalog.json",
+            (utils, "BEPINEX_RELEASES_URL"): f"{self.url}/bepinex/releases",
+            (utils, "MMHOOK_URL"): f"{self.url}/MMHOOK.zip",
+            (utils, "CHAUFFEUR_URL"): f"{self.url}/Chauffeur.dll",
+            (utils, "http_cache"): HTTPCache(os.path.join(self._cache_dir, "http")),
+            (utils, "mod_store"): mod_store,
+            (utils, "_catalog_missing_at"): None,
+            # imported by name, so every module holding them needs the new ones
+            (profiles, "mod_store"): mod_store,
+            (utils, "version_index"): version_index,
+            (mods, "version_index"): version_index,
+            (watcher, "version_index"): version_index,
+            (config, "VALIDATION_CACHE_PATH"): os.path.join(self._cache_dir, "validated.json"),
+        }
+        self._patched = {(module, name): getattr(module, name) for module, name in replacements}
+        self._patched[resolver, "BUILTIN_MODS"] = dict(resolver.BUILTIN_MODS)
+        for (module, name), value in replacements.items():
+            setattr(module, name, value)
+        for uuid, url in ((resolver.MMHOOK, utils.MMHOOK_URL), (resolver.CHAUFFEUR, utils.CHAUFFEUR_URL)):
+            resolver.BUILTIN_MODS[uuid] = resolver.BUILTIN_MODS[uuid]._replace(download_url=url)
+
+    def unpatch(self) -> None:
+        import resolver
+        builtin_mods = self._patched.pop((resolver, "BUILTIN_MODS"), None)
+        if builtin_mods:
+            resolver.BUILTIN_MODS.update(builtin_mods)
+        for (module, name), value in self._patched.items():
+            setattr(module, name, value)
+        self._patched = {}
+        if self._cache_dir:
+            shutil.rmtree(self._cache_dir, ignore_errors=True)
+            self._cache_dir = None
+
+    def clear_cache(self) -> None:
+        """Forget everything fetched so far, so the next request goes to the server again"""
+        utils.http_cache.clear()
+        utils._catalog_missing_at = None
+
+    def __enter__(self) -> "FakeRepo":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        self.patch()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.unpatch()
+        self.shutdown()
+        self.server_close()
+
+
+def fake_game_dir(directory: str, chauffeur: bool = True) -> str:
+    """Lay out an empty game folder, optionally with the folders Chauffeur installs"""
+    game_dir = os.path.join(directory, "game")
+    os.makedirs(os.path.join(game_dir, "BepInEx", "plugins"), exist_ok=True)
+    if chauffeur:
+        for name in ("MMHOOK", "Chauffeur"):
+            os.makedirs(os.path.join(game_dir, "BepInEx", "plugins", name), exist_ok=True)
+    return game_dir
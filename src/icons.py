@@ -0,0 +1,104 @@
+"""
+Disk cache of mod icon thumbnails. Files are named by the hash of their content, so mods sharing an icon share the file,
+and an index maps each icon url to its file.
+"""
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+
+from cache import load_json, save_json
+from utils import download_file, local_path
+
+
+def make_thumbnail(path: str, size: int) -> tuple[bytes, str]:
+    """Downscale an image to fit in size x size, returning the new image data and its extension"""
+    try:
+        from PIL import Image
+    except ImportError:
+        # without Pillow the best we can do is keep the original
+        with open(path, "rb") as f:
+            return f.read(), os.path.splitext(path)[1] or ".png"
+    with Image.open(path) as image:
+        image.thumbnail((size, size))
+        data = io.BytesIO()
+        image.save(data, "PNG")
+    return data.getvalue(), ".png"
+
+
+class IconCache:
+    index_name = "index.json"
+
+    def __init__(self, directory: str, max_size: int = 20 * 1024 * 1024, thumbnail_size: int = 128) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self.thumbnail_size = thumbnail_size
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] | None = None
+
+    @property
+    def entries(self) -> dict[str, dict]:
+        if self._entries is None:
+            self._entries = load_json(os.path.join(self.directory, self.index_name), {})
+        return self._entries
+
+    def cached_path(self, url: str) -> str | None:
+        """Get the thumbnail for url if it's already cached. Cheap enough to call while building the UI."""
+        if not url:
+            return None
+        with self._lock:
+            entry = self.entries.get(url)
+            if not entry:
+                return None
+            path = os.path.join(self.directory, entry["file"])
+            if not os.path.isfile(path):
+                del self.entries[url]
+                return None
+            entry["accessed"] = time.time()
+        return path
+
+    def fetch(self, url: str) -> str:
+        """Download and thumbnail the icon at url, returning the cached path. Blocks on the network."""
+        path = self.cached_path(url)
+        if path:
+            return path
+        with tempfile.TemporaryDirectory() as temp_dir:
+            download_path = os.path.join(temp_dir, "icon" + os.path.splitext(url.split("?")[0])[1])
+            download_file(url, download_path)
+            data, extension = make_thumbnail(download_path, self.thumbnail_size)
+        file_name = hashlib.sha256(data).hexdigest() + extension
+        path = os.path.join(self.directory, file_name)
+        with self._lock:
+            if not os.path.isfile(path):
+                os.makedirs(self.directory, exist_ok=True)
+                with open(f"{path}.tmp", "wb") as f:
+                    f.write(data)
+                os.replace(f"{path}.tmp", path)
+            self.entries[url] = {"file": file_name, "size": len(data), "accessed": time.time()}
+            self._evict()
+            save_json(os.path.join(self.directory, self.index_name), self.entries)
+        return path
+
+    def _evict(self) -> None:
+        files = {entry["file"]: entry["size"] for entry in self.entries.values()}
+        total = sum(files.values())
+        for url, entry in sorted(self.entries.items(), key=lambda item: item[1]["accessed"]):
+            if total <= self.max_size:
+                break
+            del self.entries[url]
+            # only drop the file once nothing else points at it
+            if all(other["file"] != entry["file"] for other in self.entries.values()):
+                total -= entry["size"]
+                try:
+                    os.remove(os.path.join(self.directory, entry["file"]))
+                except FileNotFoundError:
+                    pass
+
+    def save(self) -> None:
+        with self._lock:
+            save_json(os.path.join(self.directory, self.index_name), self.entries)
+
+
+icon_cache = IconCache(local_path("data", "cache", "icons"))
@@ -1,29 +1,41 @@
 from __future__ import annotations
 
 import os.path
-from typing import Any, NamedTuple
+from typing import Any, Callable, TYPE_CHECKING
 
+from kivy.clock import Clock
 from kivy.lang import Builder
-from kivy.properties import ConfigParser, ObjectProperty, StringProperty
-from kivy.uix.settings import SettingsWithSpinner
+from kivy.properties import BooleanProperty, ConfigParser, ObjectProperty, StringProperty
 from kivymd.app import MDApp
-from kivymd.uix.boxlayout import MDBoxLayout
-from kivymd.uix.button import MDButton
 from kivymd.uix.card import MDCard
 from kivymd.uix.navigationbar import MDNavigationItem
 from kivymd.uix.relativelayout import MDRelativeLayout
 from kivymd.uix.screen import MDScreen
-from kivymd.uix.snackbar import (
-    MDSnackbar, MDSnackbarActionButton, MDSnackbarActionButtonText,
-    MDSnackbarButtonContainer, MDSnackbarText,
-)
+from kivymd.uix.snackbar import MDSnackbar
 
+import profiler
 from config import validate_file_path
-from utils import (
-    chauffeur_installed, get_available_mods, get_installed_mod_version, get_installed_mods, get_remote_mod_version,
-    install_bepin, install_mod, is_windows, tuplize_version,
-)
-from utils import __version__, local_path
+from icons import icon_cache
+from manifests import uninstall_mod
+from mods import ModDiff, ModEntry, ModState, build_mod_data
+from resolver import InstallPlan, ResolveError, install_chauffeur, install_plan, plan_install
+from search import SORT_MODES, SearchIndex
+from tasks import Task, TaskScheduler, kivy_call_soon
+from tracing import traced
+from utils import chauffeur_installed, get_installed_mods, install_mod, is_windows
+from utils import __version__, http_cache, local_path, set_mirror
+from watcher import PluginChanges, PluginWatcher, sync_plugin_changes
+
+if TYPE_CHECKING:
+    # only needed for annotations. anything used by manager.kv is loaded through the Factory when it's needed
+    from kivy.clock import ClockEvent
+    from kivy.uix.recycleview import RecycleView
+    from kivy.uix.settings import SettingsWithSpinner
+    from kivymd.uix.boxlayout import MDBoxLayout
+    from kivymd.uix.button import MDButton
+    from kivymd.uix.snackbar import MDSnackbarActionButtonText, MDSnackbarText
+
+PLACEHOLDER_ICON = "puzzle"
 
 
 class ThemedApp(MDApp):
@@ -43,24 +55,34 @@ class ChauffeurNavigationItem(MDNavigationItem):
 
 
 class ChauffeurScreen(MDScreen):
-    pass
+    viewclass = StringProperty()
+    action_text = StringProperty()
+    action_icon = StringProperty()
+    searchable = BooleanProperty(False)
+    sort_text = StringProperty("Relevance")
 
 
 class ModCard(MDCard):
+    """Recycled view for a single mod. Populated from the rows built by `ChauffeurApp.mod_row`."""
     text = StringProperty()
     description = StringProperty()
     icon = StringProperty()
-    mod: ModEntry
+    status = StringProperty()
+    selected = BooleanProperty(False)
+    mod: ModEntry = ObjectProperty(None, allownone=True)
 
-    def __init__(self, mod_entry: ModEntry, **kwargs):
-        self.mod = mod_entry
-        super().__init__(**kwargs)
+    def on_mod(self, instance: ModCard, mod: ModEntry | None) -> None:
+        # only cards that are actually on screen exist, so this is where icons get lazily fetched
+        if mod and mod.icon and not mod.get_icon():
+            MDApp.get_running_app().request_icon(mod)
 
 
 class ModCardLayout(MDRelativeLayout):
     text = StringProperty()
     description = StringProperty()
     icon = StringProperty()
+    status = StringProperty()
+    selected = BooleanProperty(False)
 
 
 class InstalledModCard(ModCard):
@@ -78,74 +100,142 @@ class SettingsCard(MDCard):
 class ChauffeurApp(ThemedApp):
     title: str = f"Chauffeur Mod Manager v{__version__}"
     icon: str = r"assets/icon.png"
-    settings_cls = SettingsWithSpinner
+    settings_cls = "SettingsWithSpinner"
     use_kivy_settings = False
     top_screen: MDBoxLayout = ObjectProperty(None)
-    installed_mods_layout: MDBoxLayout = ObjectProperty(None)
-    available_mods_layout: MDBoxLayout = ObjectProperty(None)
-    index_data: dict[str, dict[str, str]]
-    installed_mods: list[ModEntry]
-    available_mods: list[ModEntry]
+    installed_mods_layout: RecycleView = ObjectProperty(None)
+    available_mods_layout: RecycleView = ObjectProperty(None)
+    mod_state: ModState
+    catalog_task: Task | None
+    refresh_event: ClockEvent | None
     game_path: str
     chauffeur_snack: MDSnackbar
+    chauffeur_snack_text: MDSnackbarText
+    chauffeur_snack_action: MDSnackbarActionButtonText
+    chauffeur_task: Task | None
+    tasks: TaskScheduler
+    icon_tasks: TaskScheduler
+    icon_requests: set[str]
+    mod_tasks: dict[str, Task]
+    batch_task: Task | None
+    # uuids of the mods batch_task is installing
+    batch_mods: set[str]
+    selected_mods: set[str]
+    # every available row, layout.data only holds the ones matching the search
+    available_rows: list[dict[str, Any]]
+    search_index: SearchIndex | None
+    search_query: str
+    search_sort: str
+    search_event: ClockEvent | None
+    plugin_watcher: PluginWatcher | None
 
     def build(self):
-        self.top_screen = Builder.load_file(local_path("data", "manager.kv"))
+        with profiler.measure("kv load"):
+            self.top_screen = Builder.load_file(local_path("data", "manager.kv"))
         self.set_colors()
         # self.top_screen.md_bg_color = self.theme_cls.backgroundColor
         self.installed_mods_layout = self.top_screen.ids.install.layout
         self.available_mods_layout = self.top_screen.ids.explore.layout
-        self.top_screen.ids.install.layout.scroll_y = 0
-        self.top_screen.ids.explore.layout.scroll_y = 0
-        self.installed_mods = []
-        self.available_mods = []
+        self.mod_state = ModState()
+        self.catalog_task = None
+        self.refresh_event = None
+        self.tasks = TaskScheduler()
+        self.icon_tasks = TaskScheduler(max_workers=6)
+        self.icon_requests = set()
+        self.mod_tasks = {}
+        self.batch_task = None
+        self.batch_mods = set()
+        self.selected_mods = set()
+        self.chauffeur_task = None
+        self.available_rows = []
+        self.search_index = None
+        self.search_query = ""
+        self.search_sort = SORT_MODES[0]
+        self.search_event = None
+        self.plugin_watcher = None
 
         return self.top_screen
 
     def build_config(self, config: ConfigParser) -> None:
         config = ConfigParser("Chauffeur")
         config.read(local_path("data", "chauffeur.ini"))
+        config.setdefaults("network", {"cache_ttl": 60, "cache_size": 50, "offline": 0, "refresh_interval": 30,
+                                       "max_downloads": 3, "mirror_url": ""})
+        config.setdefaults("debug", {"trace_window": 5})
         if config.get("configuration", "path") == '""':
             config.set("configuration", "path", local_path())
             config.write()
         self.config = config
 
     def build_settings(self, settings: SettingsWithSpinner):
+        from trace_settings import SettingTrace
+        settings.register_type("trace", SettingTrace)
         settings.add_json_panel("Chauffeur Settings", self.config, local_path("data", "settings.json"))
         pass
 
     def on_config_change(self, config: ConfigParser, section: str, key: str, value: Any) -> None:
-        if key == "path":
+        if section == "network":
+            self.apply_network_settings()
+        elif key == "path":
             self.game_path = value
-            if not validate_file_path(value):
-                ChauffeurSnackbar(
+            self.validate_game_path(
+                self.check_mods,
+                lambda: ChauffeurSnackbar(
                     text="Invalid path. Make sure to select the game executable.",
                     action_text="Settings",
-                ).open()
-            else:
-                self.check_mods()
+                ).open(),
+            )
         pass
 
+    def apply_network_settings(self) -> None:
+        http_cache.ttl = self.config.getfloat("network", "cache_ttl") * 60
+        http_cache.max_size = int(self.config.getfloat("network", "cache_size") * 1024 * 1024)
+        http_cache.offline = self.config.getboolean("network", "offline")
+        set_mirror(self.config.get("network", "mirror_url"))
+        if self.refresh_event:
+            self.refresh_event.cancel()
+            self.refresh_event = None
+        refresh_interval = self.config.getfloat("network", "refresh_interval") * 60
+        if refresh_interval > 0:
+            self.refresh_event = Clock.schedule_interval(self.refresh_catalog, refresh_interval)
+
+    def validate_game_path(self, on_valid: Callable[[], None], on_invalid: Callable[[], None]) -> None:
+        """Hash the game executable in the background, then call back on the main thread with the result"""
+        game_path = self.game_path
+        self.tasks.submit(
+            "Validating game path",
+            lambda task: validate_file_path(game_path),
+            on_done=lambda valid: on_valid() if valid else on_invalid(),
+        )
+
     def engage_snack(self, snack_action: str) -> None:
         if snack_action == "Settings":
             self.open_settings()
         elif snack_action == "Install":
-            self.install_chauffeur()
+            if self.chauffeur_task:
+                self.chauffeur_task.cancel()
+            else:
+                self.install_chauffeur()
 
     def launch_game(self, caller: MDButton):
-        if validate_file_path(self.game_path):
-            if is_windows:
-                os.startfile(self.game_path)
-        else:
-            self.on_missing_path()
+        self.validate_game_path(self.start_game, self.on_missing_path)
+
+    def start_game(self) -> None:
+        if is_windows:
+            os.startfile(self.game_path)
 
     def check_mods(self) -> bool:
         if not chauffeur_installed(os.path.dirname(self.game_path)):
+            from kivymd.uix.snackbar import (
+                MDSnackbarActionButton, MDSnackbarActionButtonText, MDSnackbarButtonContainer, MDSnackbarText,
+            )
+            self.chauffeur_snack_text = MDSnackbarText(text="Chauffeur not installed.", pos_hint={"center_y": 0.5})
+            self.chauffeur_snack_action = MDSnackbarActionButtonText(text="Install")
             self.chauffeur_snack = MDSnackbar(
-                MDSnackbarText(text="Chauffeur not installed.", pos_hint={"center_y": 0.5}),
+                self.chauffeur_snack_text,
                 MDSnackbarButtonContainer(
                     MDSnackbarActionButton(
-                        MDSnackbarActionButtonText(text="Install"),
+                        self.chauffeur_snack_action,
                         on_release=lambda *args: self.engage_snack("Install")
                     ),
                     pos_hint={"center_y": 0.5},
@@ -159,90 +249,358 @@ class ChauffeurApp(ThemedApp):
             )
             self.chauffeur_snack.open()
             return False
-        if self.installed_mods or self.available_mods:
-            self.installed_mods_layout.clear_widgets()
-            self.available_mods_layout.clear_widgets()
-        else:
-            self.build_mod_data()
-        for mod in self.installed_mods:
-            self.installed_mods_layout.add_widget(
-                InstalledModCard(
-                    mod,
-                    text=mod.name,
-                    description=mod.description,
-                    icon=mod.icon,
-                )
-            )
-        for mod in self.available_mods:
-            self.available_mods_layout.add_widget(
-                RemoteModCard(
-                    mod,
-                    text=mod.name,
-                    description=mod.description,
-                    icon=mod.icon,
-                )
-            )
+        self.watch_plugins()
+        self.refresh_catalog()
         return True
 
-    def build_mod_data(self) -> None:
-        index_data = get_available_mods()
-        currently_installed = get_installed_mods(os.path.dirname(self.game_path))
-        if currently_installed:
-            # build mod entries using the index data and drop them from the index
-            to_drop = []
-            for mod, data in index_data.items():
-                if data["name"] in currently_installed or mod in currently_installed:
-                    # check if there are any new versions available
-                    try:
-                        # try to lookup by the name
-                        installed_version = get_installed_mod_version(data["name"], os.path.dirname(self.game_path))
-                    except FileNotFoundError:
-                        # fallback to uuid
-                        installed_version = get_installed_mod_version(mod, os.path.dirname(self.game_path))
-                    latest_version, version_data = get_remote_mod_version(data)
-                    changelog = []
-                    if tuplize_version(installed_version) < tuplize_version(latest_version["mod_version"]):
-                        # compile all the changelogs between install and latest together
-                        for version in version_data:
-                            if tuplize_version(version["mod_version"]) > tuplize_version(installed_version):
-                                changelog.extend(version["changelog"])
-                    self.installed_mods.append(
-                        create_mod_entry(
-                            mod,
-                            data,
-                            latest_version,
-                            changelog,
-                        )
-                    )
-                    to_drop.append(mod)
-            for name in to_drop:
-                del index_data[name]
-        if index_data:
-            # build mod entries using the index data
-            for mod, data in index_data.items():
-                latest_version, version_info = get_remote_mod_version(data)
-                self.available_mods.append(
-                    create_mod_entry(
-                        mod,
-                        data,
-                        latest_version,
-                    )
-                )
+    def watch_plugins(self) -> None:
+        """Keep the installed mods in sync with changes made to the plugins folder by hand"""
+        game_dir = os.path.dirname(self.game_path)
+        if self.plugin_watcher:
+            if self.plugin_watcher.game_path == game_dir:
+                return
+            self.plugin_watcher.stop()
+        self.plugin_watcher = PluginWatcher(game_dir, lambda changes: kivy_call_soon(self.on_plugins_changed, changes))
+        self.plugin_watcher.start()
+
+    def on_plugins_changed(self, changes: PluginChanges) -> None:
+        game_dir = self.plugin_watcher.game_path
+        self.tasks.submit(
+            "Checking plugins",
+            lambda task: sync_plugin_changes(game_dir, changes),
+            on_done=self.apply_plugin_versions,
+        )
+
+    @traced("ui")
+    def apply_plugin_versions(self, versions: dict[str, str | None]) -> None:
+        """Move or update the rows of mods whose folders changed, None meaning the folder is gone"""
+        for folder, version in versions.items():
+            mod = self.mod_state.find_by_folder(folder)
+            if mod is None or mod.uuid in self.mod_tasks or mod.uuid in self.batch_mods or version == "":
+                # not in the catalog, being installed by the app which updates the row itself, or not readable yet
+                continue
+            if version is None:
+                if mod.uuid in self.mod_state.installed:
+                    self.move_mod_row(self.installed_mods_layout, self.available_mods_layout,
+                                      self.mod_state.mark_uninstalled(mod))
+            elif mod.uuid in self.mod_state.available:
+                self.move_mod_row(self.available_mods_layout, self.installed_mods_layout,
+                                  self.mod_state.set_installed_version(mod, version))
+            elif mod.installed_version != version:
+                mod = self.mod_state.set_installed_version(mod, version)
+                self.update_mod_row(self.installed_mods_layout, mod.uuid, **self.mod_row(mod))
+
+    def installed_folders(self, game_dir: str) -> set[str]:
+        if self.plugin_watcher and self.plugin_watcher.game_path == game_dir:
+            return self.plugin_watcher.mods
+        return set(get_installed_mods(game_dir))
+
+    def refresh_catalog(self, *args: Any) -> None:
+        """Rebuild the mod data in the background and apply whatever changed to the lists"""
+        if self.catalog_task or not chauffeur_installed(os.path.dirname(self.game_path)):
+            return
+
+        def on_done(mod_data: tuple[list[ModEntry], list[ModEntry]]) -> None:
+            self.catalog_task = None
+            self.show_mod_data(mod_data)
+            self.mod_state.save_snapshot(local_path("data", "cache", "catalog.json"), game_dir)
+            profiler.mark("catalog loaded")
+
+        def on_error(error: BaseException) -> None:
+            self.catalog_task = None
+            self.create_alert("Unable to load mods.")
+
+        game_dir = os.path.dirname(self.game_path)
+        self.catalog_task = self.tasks.submit(
+            "Loading mods",
+            lambda task: build_mod_data(game_dir, task.progress),
+            on_done=on_done,
+            on_error=on_error,
+        )
+
+    @traced("ui")
+    def show_mod_data(self, mod_data: tuple[list[ModEntry], list[ModEntry]]) -> None:
+        installed_diff, available_diff = self.mod_state.update(*mod_data)
+        self.apply_mod_diff(self.installed_mods_layout, installed_diff, mod_data[0])
+        self.apply_mod_diff(self.available_mods_layout, available_diff, mod_data[1])
+        if installed_diff or available_diff or self.search_index is None:
+            self.build_search_index()
+
+    @traced("ui")
+    def apply_mod_diff(self, layout: RecycleView, diff: ModDiff, mods: list[ModEntry]) -> None:
+        if not diff:
+            return
+        rows = self.mod_rows(layout)
+        if not rows:
+            rows.extend(self.mod_row(mod) for mod in mods)
+        else:
+            for mod in diff.removed:
+                i = self.find_mod_row(rows, mod.uuid)
+                if i is not None:
+                    del rows[i]
+            for mod in diff.changed:
+                i = self.find_mod_row(rows, mod.uuid)
+                if i is not None:
+                    rows[i] = {**rows[i], **self.mod_row(mod)}
+            rows.extend(self.mod_row(mod) for mod in diff.added)
+        if layout is self.available_mods_layout:
+            self.filter_mods()
+
+    def mod_rows(self, layout: RecycleView) -> list[dict[str, Any]]:
+        """All of a layout's rows, including any hidden by the search"""
+        return self.available_rows if layout is self.available_mods_layout else layout.data
+
+    def build_search_index(self) -> None:
+        mods = [*self.mod_state.installed.values(), *self.mod_state.available.values()]
+
+        def on_done(index: SearchIndex) -> None:
+            self.search_index = index
+            if self.search_query:
+                self.filter_mods()
+
+        self.tasks.submit("Indexing mods", lambda task: SearchIndex(mods), on_done=on_done)
+
+    def search_mods(self, query: str) -> None:
+        """Filter the available mods as the search is typed, waiting for a pause so every key press isn't a search"""
+        self.search_query = query
+        if self.search_event:
+            self.search_event.cancel()
+        self.search_event = Clock.schedule_once(lambda dt: self.filter_mods(), 0.15)
+
+    def cycle_search_sort(self, screen: ChauffeurScreen) -> None:
+        self.search_sort = SORT_MODES[(SORT_MODES.index(self.search_sort) + 1) % len(SORT_MODES)]
+        screen.sort_text = self.search_sort.capitalize()
+        self.filter_mods()
+
+    @traced("ui")
+    def filter_mods(self) -> None:
+        """
+        Show the available rows matching the search. The rows are reused as is, so this only swaps what the recycled
+        cards display.
+        """
+        self.search_event = None
+        if self.search_index is None or (not self.search_query and self.search_sort == SORT_MODES[0]):
+            self.available_mods_layout.data = list(self.available_rows)
+            return
+        with profiler.measure("search"):
+            rows = {row["mod"].uuid: row for row in self.available_rows}
+            matches = self.search_index.search(self.search_query, self.search_sort)
+            visible = [rows.pop(uuid) for uuid in matches if uuid in rows]
+            if not self.search_query:
+                # mods that showed up since the index was built still belong in an unfiltered list
+                visible.extend(rows.values())
+        self.available_mods_layout.data = visible
+
+    def mod_row(self, mod: ModEntry) -> dict[str, Any]:
+        """Build the RecycleView data for a mod's card"""
+        return {
+            "mod": mod,
+            "text": mod.name,
+            "description": mod.description,
+            "icon": mod.get_icon() or PLACEHOLDER_ICON,
+            "status": self.mod_status(mod),
+            "selected": mod.uuid in self.selected_mods,
+        }
+
+    def request_icon(self, mod: ModEntry) -> None:
+        """Fetch a mod's icon in the background and show it on its card once it's ready"""
+        if mod.icon in self.icon_requests:
+            return
+
+        def on_done(path: str) -> None:
+            self.icon_requests.discard(mod.icon)
+            for layout in (self.installed_mods_layout, self.available_mods_layout):
+                for row in self.mod_rows(layout):
+                    if row["mod"].icon == mod.icon:
+                        self.update_mod_row(layout, row["mod"].uuid, icon=path)
+
+        self.icon_requests.add(mod.icon)
+        self.icon_tasks.submit(
+            f"Fetching icon for {mod.name}",
+            lambda task: icon_cache.fetch(mod.icon),
+            on_done=on_done,
+        )
+
+    def mod_status(self, mod: ModEntry) -> str:
+        if mod.uuid in self.mod_tasks:
+            return self.mod_tasks[mod.uuid].status
+        if mod.outdated:
+            return f"Update to {mod.latest_version}"
+        return ""
+
+    def select_mod(self, mod: ModEntry, selected: bool) -> None:
+        if (mod.uuid in self.selected_mods) == selected:
+            return
+        if selected:
+            self.selected_mods.add(mod.uuid)
+        else:
+            self.selected_mods.discard(mod.uuid)
+        self.update_mod_row(self.available_mods_layout, mod.uuid, selected=selected)
+
+    def screen_action(self, screen: ChauffeurScreen) -> None:
+        if self.batch_task:
+            self.batch_task.cancel()
+        elif screen.name == "Installed Mods":
+            self.install_batch([mod for mod in self.mod_state.installed.values() if mod.outdated])
+        else:
+            self.install_batch([self.mod_state.available[uuid] for uuid in self.selected_mods
+                                if uuid in self.mod_state.available])
+
+    def plan_install(self, mods: list[ModEntry]) -> InstallPlan | None:
+        try:
+            return plan_install(os.path.dirname(self.game_path), mods, self.mod_state.available.values(),
+                                self.mod_state.installed.values())
+        except ResolveError as e:
+            self.create_alert(str(e))
+            return None
+
+    def install_batch(self, mods: list[ModEntry], plan: InstallPlan | None = None) -> None:
+        """
+        Install or update several mods along with their dependencies, in parallel where they don't depend on each
+        other, then refresh the lists once at the end
+        """
+        if not mods:
+            self.create_alert("Nothing to install.")
+            return
+        if self.batch_task:
+            self.create_alert("Wait for the current install to finish.")
+            return
+        plan = plan or self.plan_install(mods)
+        if plan is None:
+            return
+        mods = plan.mods
+        game_dir = os.path.dirname(self.game_path)
+        max_downloads = max(1, self.config.getint("network", "max_downloads"))
+        for mod in mods:
+            self.update_mod_row(self.available_mods_layout, mod.uuid, status="Queued")
+            self.update_mod_row(self.installed_mods_layout, mod.uuid, status="Queued")
+
+        def on_done(errors: dict[str, Exception]) -> None:
+            self.batch_task = None
+            self.batch_mods = set()
+            self.selected_mods.clear()
+            for uuid in errors:
+                self.update_mod_row(self.available_mods_layout, uuid, status="Failed")
+                self.update_mod_row(self.installed_mods_layout, uuid, status="Failed")
+            if errors:
+                self.create_alert(f"{len(errors)} of {len(mods)} mods failed to install.")
+            else:
+                self.create_alert(f"{len(mods)} mods installed!")
+            self.refresh_catalog()
+
+        def on_error(error: BaseException) -> None:
+            self.batch_task = None
+            self.batch_mods = set()
+            self.create_alert("Failed to install mods.")
+            self.refresh_catalog()
+
+        def on_progress(task: Task) -> None:
+            if task.stage == "Cancelled":
+                self.batch_task = None
+                self.batch_mods = set()
+                self.refresh_catalog()
+
+        self.batch_mods = {mod.uuid for mod in mods}
+        self.batch_task = self.tasks.submit(
+            f"Installing {len(mods)} mods",
+            lambda task: install_plan(game_dir, plan, max_downloads, task.progress),
+            on_done=on_done,
+            on_error=on_error,
+            on_progress=on_progress,
+        )
+
+    @staticmethod
+    def find_mod_row(rows: list[dict[str, Any]], mod_uuid: str) -> int | None:
+        for i, row in enumerate(rows):
+            if row["mod"].uuid == mod_uuid:
+                return i
+        return None
+
+    def update_mod_row(self, layout: RecycleView, mod_uuid: str, **changes: Any) -> None:
+        """Update a single row in place so only the card showing it gets refreshed"""
+        rows = self.mod_rows(layout)
+        i = self.find_mod_row(rows, mod_uuid)
+        if i is not None:
+            rows[i] = {**rows[i], **changes}
+        if rows is not layout.data:
+            i = self.find_mod_row(layout.data, mod_uuid)
+            if i is not None:
+                layout.data[i] = {**layout.data[i], **changes}
 
     def download_mod(self, mod_card: ModCardLayout) -> None:
         mod_entry: ModEntry = mod_card.parent.mod
-        install_mod(
-            os.path.dirname(self.game_path),
-            mod_entry.name,
-            mod_entry.download_url,
-            mod_entry.sha256,
+        if mod_entry.uuid in self.mod_tasks:
+            # a second press cancels the download
+            self.mod_tasks.pop(mod_entry.uuid).cancel()
+            return
+        plan = self.plan_install([mod_entry])
+        if plan is None:
+            return
+        if len(plan.mods) > 1:
+            # dependencies have to go in first, which the batch install takes care of
+            self.install_batch([mod_entry], plan)
+            return
+        game_dir = os.path.dirname(self.game_path)
+
+        def on_done(result: None) -> None:
+            self.mod_tasks.pop(mod_entry.uuid, None)
+            self.create_alert(f"{mod_entry.name} installed!")
+            self.move_mod_row(self.available_mods_layout, self.installed_mods_layout,
+                              self.mod_state.mark_installed(mod_entry))
+
+        def on_error(error: BaseException) -> None:
+            self.mod_tasks.pop(mod_entry.uuid, None)
+            self.create_alert(f"Failed to install {mod_entry.name}.")
+
+        def on_progress(task: Task) -> None:
+            self.update_mod_row(self.available_mods_layout, mod_entry.uuid, status=task.status)
+
+        self.mod_tasks[mod_entry.uuid] = self.tasks.submit(
+            f"Installing {mod_entry.name}",
+            lambda task: install_mod(
+                game_dir,
+                mod_entry.name,
+                mod_entry.download_url,
+                mod_entry.sha256,
+                task.progress,
+                mod_entry.uuid,
+                mod_entry.latest_version,
+                mod_entry.files,
+            ),
+            on_done=on_done,
+            on_error=on_error,
+            on_progress=on_progress,
+        )
+
+    def uninstall_mod(self, mod_card: ModCardLayout) -> None:
+        mod_entry: ModEntry = mod_card.parent.mod
+        game_dir = os.path.dirname(self.game_path)
+        mod_name = mod_entry.name if mod_entry.name in self.installed_folders(game_dir) else mod_entry.uuid
+
+        def on_done(result: None) -> None:
+            self.create_alert(f"{mod_entry.name} uninstalled.")
+            self.move_mod_row(self.installed_mods_layout, self.available_mods_layout,
+                              self.mod_state.mark_uninstalled(mod_entry))
+
+        self.tasks.submit(
+            f"Uninstalling {mod_entry.name}",
+            lambda task: uninstall_mod(game_dir, mod_name),
+            on_done=on_done,
+            on_error=lambda error: self.create_alert(f"Failed to uninstall {mod_entry.name}."),
         )
-        self.create_alert(f"{mod_entry.name} installed!")
-        self.installed_mods.append(mod_entry)
-        self.available_mods.remove(mod_entry)
-        self.check_mods()
+
+    @traced("ui")
+    def move_mod_row(self, source: RecycleView, destination: RecycleView, mod: ModEntry) -> None:
+        for layout in (source, destination):
+            rows = self.mod_rows(layout)
+            i = self.find_mod_row(rows, mod.uuid)
+            if i is not None:
+                del rows[i]
+        self.mod_rows(destination).append(self.mod_row(mod))
+        self.filter_mods()
 
     def create_alert(self, text: str) -> None:
+        from kivymd.uix.snackbar import MDSnackbarText
         MDSnackbar(
             MDSnackbarText(text=text, pos_hint={"center_x": 0.5, "center_y": 0.5}),
             pos_hint={"center_x": 0.5, "center_y": 0.2},
@@ -254,62 +612,55 @@ class ChauffeurApp(ThemedApp):
     def on_start(self):
         self.config.filename = local_path("data", "chauffeur.ini")
         self.game_path = self.config.get("configuration", "path")
-        if validate_file_path(self.game_path):
-            self.check_mods()
-        else:
-            self.on_missing_path()
+        self.apply_network_settings()
+        # show whatever we knew last time on the first frame, the real catalog gets diffed in once it's fetched
+        snapshot = ModState.load_snapshot(local_path("data", "cache", "catalog.json"), os.path.dirname(self.game_path))
+        if snapshot:
+            self.show_mod_data(snapshot)
+        self.validate_game_path(self.check_mods, self.on_missing_path)
+        Clock.schedule_once(self.on_first_frame)
+
+    def on_first_frame(self, dt: float) -> None:
+        profiler.mark("first frame")
+        profiler.report(local_path("data", "cache", "startup-profile.json"))
+
+    def on_stop(self):
+        if self.plugin_watcher:
+            self.plugin_watcher.stop()
+        self.tasks.shutdown()
+        self.icon_tasks.shutdown()
+        icon_cache.save()
+        http_cache.save()
 
     def on_missing_path(self) -> None:
         ChauffeurSnackbar(text="Game path not found.", action_text="Settings").open()
 
     def install_chauffeur(self):
-        install_bepin(os.path.dirname(self.game_path))
-        install_mod(
-            os.path.dirname(self.game_path),
-            "MMHOOK",
-            "https://github.com/harbingerofme/Bepinex.Monomod.HookGenPatcher/releases/download/1.2.1/Release.zip",
-            )
-        install_mod(
-            os.path.dirname(self.game_path),
-            "Chauffeur",
-            "https://github.com/alwaysintreble/Chauffeur/releases/download/v0.2.0/Chauffeur.dll",
-            )
-        if self.chauffeur_snack:
-            self.chauffeur_snack.dismiss()
-            self.create_alert("Chauffeur installed!")
-        self.check_mods()
-
-class ModEntry(NamedTuple):
-    uuid: str
-    name: str
-    description: str
-    author: str
-    homepage: str
-    icon: str
-    latest_version: str
-    download_url: str
-    sha256: str
-    changelog: list[str]
-
-    def get_icon(self):
-        pass
+        game_dir = os.path.dirname(self.game_path)
+
+        def on_done(result: None) -> None:
+            self.chauffeur_task = None
+            if self.chauffeur_snack:
+                self.chauffeur_snack.dismiss()
+                self.create_alert("Chauffeur installed!")
+            self.check_mods()
 
-def create_mod_entry(
-        mod_uuid: str,
-        mod_data: dict[str, str],
-        latest_version: dict[str, str],
-        changelog: list[str] | None = None
-        ) -> ModEntry:
-    changelog = changelog or []
-    return ModEntry(
-        mod_uuid,
-        mod_data["name"],
-        mod_data["description"],
-        mod_data["author"],
-        mod_data["homepage"],
-        mod_data.get("icon_url", ""),
-        latest_version["mod_version"],
-        latest_version["download_url"],
-        latest_version["sha256"],
-        changelog,
-    )
+        def on_error(error: BaseException) -> None:
+            self.chauffeur_task = None
+            self.chauffeur_snack_text.text = "Chauffeur install failed."
+            self.chauffeur_snack_action.text = "Install"
+
+        def on_progress(task: Task) -> None:
+            self.chauffeur_snack_text.text = task.status
+            if task.stage == "Cancelled":
+                self.chauffeur_task = None
+                self.chauffeur_snack_action.text = "Install"
+
+        self.chauffeur_snack_action.text = "Cancel"
+        self.chauffeur_task = self.tasks.submit(
+            "Installing Chauffeur",
+            lambda task: install_chauffeur(game_dir, task.progress, task.set_stage),
+            on_done=on_done,
+            on_error=on_error,
+            on_progress=on_progress,
+        )
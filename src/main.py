@@ -1,5 +1,13 @@
-from kvui import ChauffeurApp
+import sys
+
+import profiler
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # any arguments means a headless run, so the gui stack never gets imported
+        from cli import main
+        sys.exit(main())
+    with profiler.measure("import"):
+        from kvui import ChauffeurApp
     ChauffeurApp().run()
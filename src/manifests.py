@@ -0,0 +1,166 @@
+"""
+Install manifests record what every installed mod put on disk, so installed versions can be looked up without scanning
+dlls and mods can be uninstalled and verified. All manifests for a game live in one file, BepInEx/chauffeur.json.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from typing import NamedTuple
+
+from cache import load_json, save_json
+from tracing import span
+
+manifest_lock = threading.Lock()
+# game path -> (manifest file mtime, manifests)
+_loaded: dict[str, tuple[int, dict[str, dict]]] = {}
+
+
+class ModManifest(NamedTuple):
+    name: str
+    uuid: str
+    version: str
+    source: str
+    # path relative to the mod folder -> [size, mtime_ns, sha256]
+    files: dict[str, list]
+
+
+def manifest_path(game_path: str) -> str:
+    return os.path.join(game_path, "BepInEx", "chauffeur.json")
+
+
+def mod_file_path(mod_folder: str, relative_path: str) -> str:
+    """Join a manifest path onto its mod folder, raising ValueError for paths that would land outside of it"""
+    mod_folder = os.path.abspath(mod_folder)
+    path = os.path.abspath(os.path.join(mod_folder, *relative_path.replace("\\", "/").split("/")))
+    if (os.path.isabs(relative_path) or relative_path.startswith(("/", "\\")) or
+            os.path.commonpath([mod_folder, path]) != mod_folder or path == mod_folder):
+        raise ValueError(f"Refusing to use {relative_path} outside of {mod_folder}")
+    return path
+
+
+def hash_file(path: str, chunk_size: int = 64 * 1024) -> str:
+    file_hash = hashlib.sha256()
+    with span("hash", "hash", file=os.path.basename(path)) as trace, open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            file_hash.update(chunk)
+        trace["bytes"] = f.tell()
+    return file_hash.hexdigest()
+
+
+def scan_folder(folder: str) -> dict[str, list]:
+    """Get the size, mtime and hash of every file in folder"""
+    files = {}
+    for root, dirs, file_names in os.walk(folder):
+        for file_name in file_names:
+            path = os.path.join(root, file_name)
+            stat = os.stat(path)
+            files[os.path.relpath(path, folder).replace(os.sep, "/")] = [stat.st_size, stat.st_mtime_ns, hash_file(path)]
+    return files
+
+
+def _load(game_path: str) -> dict[str, dict]:
+    path = manifest_path(game_path)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    cached = _loaded.get(game_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    manifests = load_json(path, {})
+    _loaded[game_path] = mtime, manifests
+    return manifests
+
+
+def _save(game_path: str, manifests: dict[str, dict]) -> None:
+    path = manifest_path(game_path)
+    save_json(path, manifests)
+    _loaded[game_path] = os.stat(path).st_mtime_ns, manifests
+
+
+def get_manifests(game_path: str) -> dict[str, ModManifest]:
+    """Get the manifest of every installed mod, keyed by mod folder name"""
+    with manifest_lock:
+        return {name: ModManifest(name, **manifest) for name, manifest in _load(game_path).items()}
+
+
+def get_manifest(game_path: str, mod_name: str) -> ModManifest | None:
+    with manifest_lock:
+        manifest = _load(game_path).get(mod_name)
+    return ModManifest(mod_name, **manifest) if manifest else None
+
+
+def record_install(game_path: str, mod_name: str, files: dict[str, list], mod_uuid: str = "", version: str = "",
+                   source: str = "") -> None:
+    with manifest_lock:
+        manifests = dict(_load(game_path))
+        manifests[mod_name] = {"uuid": mod_uuid, "version": version, "source": source, "files": files}
+        _save(game_path, manifests)
+
+
+def forget_mod(game_path: str, mod_name: str) -> None:
+    with manifest_lock:
+        manifests = dict(_load(game_path))
+        if manifests.pop(mod_name, None):
+            _save(game_path, manifests)
+
+
+def uninstall_mod(game_path: str, mod_name: str) -> None:
+    """
+    Remove the files a mod installed. Files the mod didn't install, like its settings, are left alone and so is their
+    folder, which then holds no version to read and isn't treated as installed, see mods.build_mod_data.
+    """
+    mod_folder = os.path.join(game_path, "BepInEx", "plugins", mod_name)
+    manifest = get_manifest(game_path, mod_name)
+    if manifest is None:
+        # installed before manifests existed, so the whole folder is all we know about
+        shutil.rmtree(mod_folder, ignore_errors=True)
+    else:
+        for relative_path in manifest.files:
+            try:
+                os.remove(mod_file_path(mod_folder, relative_path))
+            except FileNotFoundError:
+                pass
+            except ValueError as e:
+                logging.warning(f"Skipping {relative_path} while uninstalling {mod_name}: {e}")
+        for root, dirs, files in os.walk(mod_folder, topdown=False):
+            if not os.listdir(root):
+                os.rmdir(root)
+    forget_mod(game_path, mod_name)
+
+
+def verify_mod(game_path: str, mod_name: str) -> list[str]:
+    """
+    Check an installed mod against its manifest, returning a description of every problem found. Files are only
+    re-hashed when their size or mtime changed since install.
+    """
+    manifest = get_manifest(game_path, mod_name)
+    if manifest is None:
+        return ["no install manifest"]
+    mod_folder = os.path.join(game_path, "BepInEx", "plugins", mod_name)
+    problems = []
+    refreshed = {}
+    for relative_path, (size, mtime, sha256) in manifest.files.items():
+        try:
+            path = mod_file_path(mod_folder, relative_path)
+        except ValueError:
+            problems.append(f"{relative_path} is outside of the mod folder")
+            continue
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            problems.append(f"{relative_path} is missing")
+            continue
+        if stat.st_size == size and stat.st_mtime_ns == mtime:
+            continue
+        if stat.st_size == size and hash_file(path) == sha256:
+            # only touched, remember the new mtime so it isn't hashed again next time
+            refreshed[relative_path] = [size, stat.st_mtime_ns, sha256]
+        else:
+            problems.append(f"{relative_path} has been modified")
+    if refreshed:
+        record_install(game_path, mod_name, {**manifest.files, **refreshed}, manifest.uuid, manifest.version,
+                       manifest.source)
+    return problems
@@ -0,0 +1,217 @@
+"""
+LAN mirror, so a room full of machines fetches the catalog, versions manifests and mod downloads from upstream once.
+One instance runs the mirror and the others set it as their mirror url, see utils.set_mirror. Anything the mirror
+doesn't have yet it fetches through its own http cache, so concurrent clients asking for the same thing cause one
+upstream request. Downloads are kept on disk, checked against the sha256 clients expect, and streamed with Range support.
+Run with `python cli.py mirror --port 8765`
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import utils
+from cache import load_json, save_json
+
+DEFAULT_PORT = 8765
+
+
+def find_hosts(data: Any) -> set[str]:
+    """Every host linked from some json"""
+    if isinstance(data, dict):
+        return set().union(*(find_hosts(value) for value in data.values()))
+    if isinstance(data, list):
+        return set().union(*(find_hosts(value) for value in data))
+    if isinstance(data, str) and data.startswith(("http://", "https://")):
+        return {urlsplit(data).hostname or ""}
+    return set()
+
+
+class MirrorHandler(BaseHTTPRequestHandler):
+    server: "MirrorServer"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        self.handle_mirror(send_body=True)
+
+    def do_HEAD(self) -> None:
+        self.handle_mirror(send_body=False)
+
+    def handle_mirror(self, send_body: bool) -> None:
+        """Paths are /<kind>/<scheme>/<upstream url without the scheme>, as built by utils.mirror_url"""
+        parsed = urlsplit(self.path)
+        kind, _, upstream = parsed.path.lstrip("/").partition("/")
+        scheme, _, rest = upstream.partition("/")
+        if kind not in ("data", "files") or scheme not in ("http", "https") or not rest:
+            self.send_error(404)
+            return
+        url = f"{scheme}://{unquote(rest)}"
+        if not self.server.is_allowed(url):
+            # only mirror what the mod data links to, rather than being an open proxy
+            self.send_error(403)
+            return
+        try:
+            if kind == "data":
+                self.send_data(url, send_body)
+            else:
+                self.send_download(url, parse_qs(parsed.query).get("sha256", [""])[0], send_body)
+        except (BrokenPipeError, ConnectionResetError):
+            # the client went away mid response
+            self.close_connection = True
+
+    def send_data(self, url: str, send_body: bool) -> None:
+        try:
+            body = self.server.get_data(url)
+        except utils.HTTPStatusError as e:
+            self.send_error(404 if e.status_code == 404 else 502)
+            return
+        except (OSError, ValueError, RuntimeError) as e:
+            logging.warning(f"Mirror unable to get {url}: {e}")
+            self.send_error(502)
+            return
+        entry = utils.http_cache.get(url)
+        etag = entry.etag if entry and entry.etag else f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        if etag in self.headers.get("If-None-Match", ""):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_download(self, url: str, sha256: str, send_body: bool) -> None:
+        try:
+            path, file_hash = self.server.get_download(url, sha256)
+        except utils.HTTPStatusError as e:
+            self.send_error(404 if e.status_code == 404 else 502)
+            return
+        except (OSError, ValueError) as e:
+            logging.warning(f"Mirror unable to download {url}: {e}")
+            self.send_error(502)
+            return
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", self.headers.get("Range", ""))
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            else:
+                # the last n bytes
+                start = max(size - int(match.group(2)), 0)
+            if start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", f'"{file_hash}"')
+        self.end_headers()
+        if send_body and end >= start:
+            with open(path, "rb") as f:
+                # straight from the page cache to the socket where the os can
+                self.connection.sendfile(f, start, end - start + 1)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logging.debug(f"Mirror {self.address_string()}: {format % args}")
+
+
+class MirrorServer(ThreadingHTTPServer):
+    """Serves the mirror from directory, which holds the downloads and their hashes"""
+    daemon_threads = True
+    # lots of clients tend to start at once
+    request_queue_size = 64
+
+    def __init__(self, host: str = "0.0.0.0", port: int = DEFAULT_PORT,
+                 directory: str = utils.local_path("data", "mirror")) -> None:
+        super().__init__((host, port), MirrorHandler)
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._url_locks: dict[str, threading.Lock] = {}
+        # download url -> sha256 of the file kept for it
+        self._downloads: dict[str, str] = load_json(os.path.join(directory, "downloads.json"), {})
+        self.allowed_hosts = {urlsplit(url).hostname for url in (
+            utils.AVAILABLE_MODS_URL, utils.CATALOG_URL, utils.BEPINEX_RELEASES_URL, utils.MMHOOK_URL,
+            utils.CHAUFFEUR_URL)}
+        self.allowed_hosts.add("github.com")
+        self._hosts_learned = 0.0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def is_allowed(self, url: str) -> bool:
+        host = urlsplit(url).hostname
+        if host not in self.allowed_hosts and time.monotonic() - self._hosts_learned > 60:
+            # a client may have had the mod data cached and never asked the mirror for it
+            self._hosts_learned = time.monotonic()
+            for index_url in (utils.CATALOG_URL, utils.AVAILABLE_MODS_URL):
+                try:
+                    self.get_data(index_url)
+                except (OSError, ValueError, RuntimeError):
+                    continue
+        return host in self.allowed_hosts
+
+    def url_lock(self, url: str) -> threading.Lock:
+        """A lock per upstream url, so clients asking for the same thing at once share one upstream request"""
+        with self._lock:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+    def get_data(self, url: str) -> bytes:
+        with self.url_lock(url):
+            data = utils.request_data(url, use_mirror=False)
+        hosts = find_hosts(data)
+        with self._lock:
+            self.allowed_hosts |= hosts
+        return utils.http_cache.read(url)
+
+    def download_path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode()).hexdigest())
+
+    def get_download(self, url: str, sha256: str = "") -> tuple[str, str]:
+        """Get the path and hash of the file kept for url, downloading it if it's missing or not the one expected"""
+        path = self.download_path(url)
+        with self.url_lock(url):
+            with self._lock:
+                file_hash = self._downloads.get(url)
+            if file_hash and os.path.isfile(path) and (not sha256 or file_hash == sha256.lower()):
+                return path, file_hash
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                file_hash = utils.download_file(url, temp_path, sha256, use_mirror=False)
+                os.replace(temp_path, path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            with self._lock:
+                self._downloads[url] = file_hash
+                save_json(os.path.join(self.directory, "downloads.json"), self._downloads)
+        return path, file_hash
+
+    def __enter__(self) -> "MirrorServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.shutdown()
+        self.server_close()
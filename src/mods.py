@@ -0,0 +1,215 @@
+import logging
+from typing import Any, NamedTuple
+
+from cache import load_json, save_json
+from icons import icon_cache
+from tracing import traced
+from utils import (
+    get_available_mods, get_catalog, get_installed_mod_version, get_installed_mods, get_remote_mod_versions,
+    tuplize_version, version_index, ProgressCallback,
+)
+
+
+class ModEntry(NamedTuple):
+    uuid: str
+    name: str
+    description: str
+    author: str
+    homepage: str
+    icon: str
+    latest_version: str
+    download_url: str
+    sha256: str
+    changelog: list[str]
+    installed_version: str = ""
+    # uuid -> version constraint, see resolver.satisfies
+    dependencies: dict[str, str] = {}
+    # the latest version's file manifest if it publishes one, for delta updates, see utils.update_mod_files
+    files: dict[str, dict] = {}
+
+    @property
+    def outdated(self) -> bool:
+        return bool(self.installed_version and self.download_url and
+                    tuplize_version(self.latest_version) > tuplize_version(self.installed_version))
+
+    def get_icon(self) -> str | None:
+        """Get the path of this mod's icon thumbnail if it's already cached"""
+        return icon_cache.cached_path(self.icon)
+
+
+def create_mod_entry(
+        mod_uuid: str,
+        mod_data: dict[str, Any],
+        latest_version: dict[str, Any],
+        changelog: list[str] | None = None,
+        installed_version: str = "",
+        ) -> ModEntry:
+    changelog = changelog or []
+    return ModEntry(
+        mod_uuid,
+        mod_data["name"],
+        mod_data["description"],
+        mod_data["author"],
+        mod_data["homepage"],
+        mod_data.get("icon_url", ""),
+        latest_version["mod_version"],
+        latest_version["download_url"],
+        latest_version["sha256"],
+        changelog,
+        installed_version,
+        latest_version.get("dependencies") or mod_data.get("dependencies") or {},
+        latest_version.get("files") or {},
+    )
+
+
+@traced("catalog")
+def build_mod_data(game_dir: str, progress: ProgressCallback | None = None) -> tuple[list[ModEntry], list[ModEntry]]:
+    """
+    Build the installed and available mod lists. Blocks on the network. With an aggregated catalog this is a single
+    request, plus one for each outdated mod's changelog. Otherwise every mod's versions manifest is fetched.
+    """
+    installed_mods: list[ModEntry] = []
+    available_mods: list[ModEntry] = []
+    catalog = get_catalog()
+    index_data = catalog.index_data if catalog else get_available_mods()
+    currently_installed = get_installed_mods(game_dir)
+    installed_versions: dict[str, str] = {}
+    for mod, data in index_data.items():
+        if data["name"] in currently_installed or mod in currently_installed:
+            # the folder is named after the mod, or its uuid as a fallback
+            folder = data["name"] if data["name"] in currently_installed else mod
+            try:
+                installed_versions[mod] = get_installed_mod_version(folder, game_dir)
+            except (OSError, ValueError) as e:
+                # like the settings an uninstalled mod leaves behind, which doesn't make it installed
+                logging.info(f"Unable to read the version of {folder}, treating it as not installed: {e}")
+    version_index.save()
+    if catalog:
+        logging.info(f"Catalog revision {catalog.revision}")
+        remote_versions = {mod: (latest, [latest]) for mod, latest in catalog.latest.items()}
+        outdated = {mod: index_data[mod] for mod, version in installed_versions.items() if mod in catalog.latest and
+                    tuplize_version(version) < tuplize_version(catalog.latest[mod]["mod_version"])}
+        remote_versions.update(get_remote_mod_versions(outdated, progress=progress))
+    else:
+        remote_versions = get_remote_mod_versions(index_data, progress=progress)
+    for mod, data in index_data.items():
+        if mod in installed_versions:
+            installed_version = installed_versions[mod]
+            changelog = []
+            if mod in remote_versions:
+                latest_version, version_data = remote_versions[mod]
+                # check if there are any new versions available
+                if tuplize_version(installed_version) < tuplize_version(latest_version["mod_version"]):
+                    # compile all the changelogs between install and latest together
+                    for version in version_data:
+                        if tuplize_version(version["mod_version"]) > tuplize_version(installed_version):
+                            changelog.extend(version.get("changelog", []))
+            else:
+                # couldn't reach the manifest, so all we know is what's installed
+                latest_version = {"mod_version": installed_version, "download_url": "", "sha256": ""}
+            installed_mods.append(
+                create_mod_entry(
+                    mod,
+                    data,
+                    latest_version,
+                    changelog,
+                    installed_version,
+                )
+            )
+        elif mod in remote_versions:
+            latest_version, version_info = remote_versions[mod]
+            available_mods.append(
+                create_mod_entry(
+                    mod,
+                    data,
+                    latest_version,
+                )
+            )
+    return installed_mods, available_mods
+
+
+class ModDiff(NamedTuple):
+    added: list[ModEntry]
+    removed: list[ModEntry]
+    changed: list[ModEntry]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+def diff_mods(current: dict[str, ModEntry], new: list[ModEntry]) -> ModDiff:
+    """Work out what changed between the current mods and a new snapshot of them"""
+    new_uuids = {mod.uuid for mod in new}
+    return ModDiff(
+        [mod for mod in new if mod.uuid not in current],
+        [mod for uuid, mod in current.items() if uuid not in new_uuids],
+        [mod for mod in new if mod.uuid in current and current[mod.uuid] != mod],
+    )
+
+
+class ModState:
+    """The installed and available mods, keyed by uuid"""
+    installed: dict[str, ModEntry]
+    available: dict[str, ModEntry]
+
+    def __init__(self) -> None:
+        self.installed = {}
+        self.available = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.installed or self.available)
+
+    def update(self, installed: list[ModEntry], available: list[ModEntry]) -> tuple[ModDiff, ModDiff]:
+        """Replace the state with a new snapshot, returning the installed and available diffs"""
+        diffs = diff_mods(self.installed, installed), diff_mods(self.available, available)
+        self.installed = {mod.uuid: mod for mod in installed}
+        self.available = {mod.uuid: mod for mod in available}
+        return diffs
+
+    def save_snapshot(self, path: str, game_dir: str) -> None:
+        """Save the state so the next launch can show it before the catalog is fetched"""
+        save_json(path, {
+            "game_dir": game_dir,
+            "installed": [list(mod) for mod in self.installed.values()],
+            "available": [list(mod) for mod in self.available.values()],
+        })
+
+    @staticmethod
+    def load_snapshot(path: str, game_dir: str) -> tuple[list[ModEntry], list[ModEntry]] | None:
+        snapshot = load_json(path)
+        if not snapshot or snapshot.get("game_dir") != game_dir:
+            return None
+        try:
+            return ([ModEntry(*mod) for mod in snapshot["installed"]],
+                    [ModEntry(*mod) for mod in snapshot["available"]])
+        except (KeyError, TypeError):
+            return None
+
+    def mark_installed(self, mod: ModEntry) -> ModEntry:
+        mod = mod._replace(installed_version=mod.latest_version, changelog=[])
+        self.available.pop(mod.uuid, None)
+        self.installed[mod.uuid] = mod
+        return mod
+
+    def mark_uninstalled(self, mod: ModEntry) -> ModEntry:
+        mod = mod._replace(installed_version="", changelog=[])
+        self.installed.pop(mod.uuid, None)
+        self.available[mod.uuid] = mod
+        return mod
+
+    def set_installed_version(self, mod: ModEntry, version: str) -> ModEntry:
+        """Record a version found on disk, for mods installed or changed outside of the app"""
+        mod = mod._replace(installed_version=version, changelog=[])
+        self.available.pop(mod.uuid, None)
+        self.installed[mod.uuid] = mod
+        return mod
+
+    def find_by_folder(self, folder: str) -> ModEntry | None:
+        """Find the mod installed to a plugins folder, which is named after either its name or its uuid"""
+        for mods in (self.installed, self.available):
+            if folder in mods:
+                return mods[folder]
+            for mod in mods.values():
+                if mod.name == folder:
+                    return mod
+        return None
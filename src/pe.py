@@ -0,0 +1,84 @@
+"""
+Minimal reader for the version resource of PE (.dll/.exe) files, so installed mod versions can be read without pywin32.
+Only the headers needed to find RT_VERSION are read, through mmap.
+"""
+import mmap
+import struct
+
+RT_VERSION = 16
+FIXED_FILE_INFO_SIGNATURE = struct.pack("<I", 0xFEEF04BD)
+
+
+class PEError(ValueError):
+    pass
+
+
+def _rva_to_offset(sections: list[tuple[int, int, int]], rva: int) -> int:
+    for virtual_address, virtual_size, raw_pointer in sections:
+        if virtual_address <= rva < virtual_address + virtual_size:
+            return rva - virtual_address + raw_pointer
+    raise PEError(f"RVA {rva:#x} isn't in any section")
+
+
+def _first_entry(data: mmap.mmap, directory: int, entry_id: int | None = None) -> int:
+    """Get the OffsetToData of a resource directory entry, matching entry_id if given, else the first entry"""
+    named, ids = struct.unpack_from("<HH", data, directory + 12)
+    for i in range(named + ids):
+        name, offset = struct.unpack_from("<II", data, directory + 16 + i * 8)
+        if entry_id is None or name == entry_id:
+            return offset
+    raise PEError("Resource not found")
+
+
+def _read_fixed_file_info(data: mmap.mmap) -> tuple[int, int]:
+    if data[:2] != b"MZ":
+        raise PEError("Not a PE file")
+    pe_offset, = struct.unpack_from("<I", data, 0x3C)
+    if data[pe_offset:pe_offset + 4] != b"PE\0\0":
+        raise PEError("Not a PE file")
+    section_count, optional_size = struct.unpack_from("<H12xH", data, pe_offset + 6)
+    optional_header = pe_offset + 24
+    magic, = struct.unpack_from("<H", data, optional_header)
+    if magic == 0x10B:  # PE32
+        directories = optional_header + 96
+    elif magic == 0x20B:  # PE32+
+        directories = optional_header + 112
+    else:
+        raise PEError(f"Unknown optional header magic {magic:#x}")
+    directory_count, = struct.unpack_from("<I", data, directories - 4)
+    if directory_count <= 2:
+        raise PEError("No resource directory")
+    resource_rva, resource_size = struct.unpack_from("<II", data, directories + 2 * 8)
+    if not resource_rva:
+        raise PEError("No resource directory")
+
+    sections = []
+    section_table = optional_header + optional_size
+    for i in range(section_count):
+        virtual_size, virtual_address, raw_size, raw_pointer = struct.unpack_from(
+            "<IIII", data, section_table + i * 40 + 8)
+        sections.append((virtual_address, max(virtual_size, raw_size), raw_pointer))
+
+    resources = _rva_to_offset(sections, resource_rva)
+    # type -> name -> language -> data entry
+    entry = _first_entry(data, resources, RT_VERSION)
+    for _ in range(2):
+        if not entry & 0x80000000:
+            raise PEError("Malformed version resource")
+        entry = _first_entry(data, resources + (entry & 0x7FFFFFFF))
+    data_rva, data_size = struct.unpack_from("<II", data, resources + entry)
+    version_info = _rva_to_offset(sections, data_rva)
+    signature = data.find(FIXED_FILE_INFO_SIGNATURE, version_info, version_info + data_size)
+    if signature == -1:
+        raise PEError("No fixed file info in version resource")
+    return struct.unpack_from("<II", data, signature + 8)
+
+
+def get_file_version(path: str) -> tuple[int, int, int, int]:
+    """Get the FileVersion of a PE file as (major, minor, build, revision)"""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        try:
+            ms, ls = _read_fixed_file_info(data)
+        except struct.error as e:
+            raise PEError(f"Truncated PE file {path}") from e
+    return ms >> 16, ms & 0xFFFF, ls >> 16, ls & 0xFFFF
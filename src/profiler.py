@@ -0,0 +1,48 @@
+"""
+Startup profiler, enabled by setting CHAUFFEUR_PROFILE=1 or passing --profile. Import this first so the clock starts as
+early as possible.
+"""
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+start = time.perf_counter()
+enabled = bool(os.environ.get("CHAUFFEUR_PROFILE"))
+if "--profile" in sys.argv:
+    # kivy parses argv as well and doesn't know this one
+    sys.argv.remove("--profile")
+    enabled = True
+
+timings: dict[str, float] = {}
+
+
+def mark(name: str) -> None:
+    """Record how long after startup something happened"""
+    if enabled and name not in timings:
+        timings[name] = time.perf_counter() - start
+
+
+@contextmanager
+def measure(name: str) -> Iterator[None]:
+    """Record how long the block takes"""
+    if not enabled:
+        yield
+        return
+    block_start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - block_start
+
+
+def report(path: str | None = None) -> None:
+    if not enabled:
+        return
+    lines = [f"{name}: {seconds * 1000:.1f} ms" for name, seconds in timings.items()]
+    logging.info("Startup profile:\n  " + "\n  ".join(lines))
+    if path:
+        from cache import save_json
+        save_json(path, {name: seconds * 1000 for name, seconds in timings.items()})
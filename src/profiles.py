@@ -0,0 +1,130 @@
+"""
+Named profiles of installed mods, like a speedrun and a casual loadout. A profile records which stored package each mod
+folder should have, so switching profiles or rolling a mod back just copies files back from the mod store.
+"""
+import os
+import tempfile
+
+from cache import load_json, save_json
+from manifests import get_manifest, get_manifests, record_install, scan_folder, uninstall_mod, verify_mod
+from store import Package, package_key
+from utils import get_installed_mod_version, get_installed_mods, mod_store, replace_folder
+
+
+def profiles_path() -> str:
+    return os.path.join(mod_store.directory, "profiles.json")
+
+
+def get_profiles() -> dict[str, dict[str, str]]:
+    """Every profile, as mod folder name -> package key"""
+    return load_json(profiles_path(), {})
+
+
+def install_package(game_path: str, package: Package, mod_name: str = "") -> None:
+    """Install a stored package without touching the network, staged and swapped in like a download"""
+    mod_name = mod_name or package.name
+    staging_folder = os.path.join(game_path, "BepInEx", ".staging")
+    os.makedirs(staging_folder, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=staging_folder) as temp_dir:
+        staged_folder = os.path.join(temp_dir, mod_name)
+        os.makedirs(staged_folder)
+        files = mod_store.materialize(package, staged_folder)
+        plugins_folder = os.path.join(game_path, "BepInEx", "plugins")
+        os.makedirs(plugins_folder, exist_ok=True)
+        replace_folder(staged_folder, os.path.join(plugins_folder, mod_name))
+    record_install(game_path, mod_name, files, package.uuid, package.version, package.source)
+
+
+def is_installed(game_path: str, mod_name: str, package: Package) -> bool:
+    manifest = get_manifest(game_path, mod_name)
+    return bool(manifest and {path: [size, sha256] for path, (size, mtime, sha256) in manifest.files.items()}
+                == package.files and not verify_mod(game_path, mod_name))
+
+
+def store_installed_mod(game_path: str, mod_name: str) -> Package:
+    """Make sure what's installed in a mod folder is in the store, so it can be brought back later"""
+    manifest = get_manifest(game_path, mod_name)
+    if manifest is None or verify_mod(game_path, mod_name):
+        # installed before manifests, or changed since, so what's on disk has to be hashed
+        folder = os.path.join(game_path, "BepInEx", "plugins", mod_name)
+        version = manifest.version if manifest else get_installed_mod_version(mod_name, game_path)
+        record_install(game_path, mod_name, scan_folder(folder), manifest.uuid if manifest else "", version,
+                       manifest.source if manifest else "")
+        manifest = get_manifest(game_path, mod_name)
+    package = mod_store.get_package(package_key(mod_name, manifest.uuid, manifest.version))
+    if package and mod_store.is_complete(package) and is_installed(game_path, mod_name, package):
+        return package
+    return mod_store.add_package(os.path.join(game_path, "BepInEx", "plugins", mod_name), manifest.files, mod_name,
+                                 manifest.uuid, manifest.version, manifest.source)
+
+
+def save_profile(game_path: str, name: str) -> dict[str, str]:
+    """Save the installed mods as a profile"""
+    profile = {mod_name: store_installed_mod(game_path, mod_name).key for mod_name in get_installed_mods(game_path)}
+    profiles = get_profiles()
+    profiles[name] = profile
+    save_json(profiles_path(), profiles)
+    return profile
+
+
+def prune_store(game_paths: list[str]) -> int:
+    """
+    Drop every stored package that no profile uses and that isn't installed in one of game_paths, returning how many
+    files went. Older versions go too, so they can't be rolled back to afterwards.
+    """
+    keep = {key for profile in get_profiles().values() for key in profile.values()}
+    for game_path in game_paths:
+        keep.update(package_key(mod_name, manifest.uuid, manifest.version)
+                    for mod_name, manifest in get_manifests(game_path).items())
+    return mod_store.prune(keep)
+
+
+def delete_profile(name: str) -> None:
+    profiles = get_profiles()
+    if profiles.pop(name, None) is None:
+        raise ValueError(f"No profile named {name}")
+    save_json(profiles_path(), profiles)
+
+
+def apply_profile(game_path: str, name: str) -> tuple[list[str], list[str]]:
+    """
+    Switch the installed mods to a profile. Only mods that differ are touched, and mods being removed are stored first
+    so switching back works. Returns the mod folders installed and removed.
+    """
+    profile = get_profiles().get(name)
+    if profile is None:
+        raise ValueError(f"No profile named {name}")
+    packages = {}
+    for mod_name, key in profile.items():
+        package = mod_store.get_package(key)
+        if package is None or not mod_store.is_complete(package):
+            raise ValueError(f"{key} is missing from the mod store")
+        packages[mod_name] = package
+    installed, removed = [], []
+    for mod_name in get_installed_mods(game_path):
+        if mod_name not in profile:
+            store_installed_mod(game_path, mod_name)
+            uninstall_mod(game_path, mod_name)
+            removed.append(mod_name)
+    for mod_name, package in packages.items():
+        if not is_installed(game_path, mod_name, package):
+            install_package(game_path, package, mod_name)
+            installed.append(mod_name)
+    return installed, removed
+
+
+def rollback_mod(game_path: str, mod_name: str, version: str = "") -> Package:
+    """Switch an installed mod to another stored version, by default the newest one that isn't installed"""
+    manifests = get_manifests(game_path)
+    manifest = manifests.get(mod_name)
+    current = manifest.version if manifest else ""
+    candidates = mod_store.find_packages(mod_name, manifest.uuid if manifest else "")
+    for package in candidates:
+        if (package.version == version if version else package.version != current) and mod_store.is_complete(package):
+            break
+    else:
+        raise ValueError(f"No stored version of {mod_name} to roll back to")
+    if manifest:
+        store_installed_mod(game_path, mod_name)
+    install_package(game_path, package, mod_name)
+    return package
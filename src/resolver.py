@@ -0,0 +1,269 @@
+"""
+Dependency resolution for the mod catalog. Mods declare dependencies as {uuid: constraint}, where a constraint is "*" or
+a comma separated list of comparisons like ">=1.2.0, <2.0.0". Caret (^1.2.0) and tilde (~1.2.0) ranges work like npm.
+Every catalog mod implicitly depends on Chauffeur, which depends on MMHOOK, which depends on BepInEx.
+"""
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, NamedTuple
+
+from manifests import get_manifest
+from mods import ModEntry
+from utils import CHAUFFEUR_URL, MMHOOK_URL, chauffeur_installed, install_bepin, install_mod, ProgressCallback
+
+BEPINEX = "BepInEx"
+MMHOOK = "MMHOOK"
+CHAUFFEUR = "Chauffeur"
+
+BUILTIN_MODS = {
+    BEPINEX: ModEntry(BEPINEX, "BepInEx", "Mod loader", "BepInEx", "https://github.com/BepInEx/BepInEx", "", "5.0.0",
+                      "", "", []),
+    MMHOOK: ModEntry(MMHOOK, "MMHOOK", "HookGen patcher", "harbingerofme",
+                     "https://github.com/harbingerofme/Bepinex.Monomod.HookGenPatcher", "", "1.2.1", MMHOOK_URL, "", [],
+                     dependencies={BEPINEX: "*"}),
+    CHAUFFEUR: ModEntry(CHAUFFEUR, "Chauffeur", "Modding library", "alwaysintreble",
+                        "https://github.com/alwaysintreble/Chauffeur", "", "0.2.0", CHAUFFEUR_URL, "", [],
+                        dependencies={MMHOOK: ">=1.2.1"}),
+}
+
+
+class ResolveError(ValueError):
+    pass
+
+
+def version_key(version: str) -> tuple[int, ...]:
+    try:
+        pieces = [int(piece) for piece in version.strip().lstrip("v").split(".")]
+    except ValueError:
+        # versions come from the catalog, so a bad one shouldn't be any worse than an unsatisfiable one
+        raise ResolveError(f"Invalid version {version!r}") from None
+    return tuple(pieces + [0] * (3 - len(pieces)))
+
+
+def satisfies(version: str, constraint: str) -> bool:
+    """Check a version against a constraint. An unknown (empty) version satisfies anything."""
+    if not version:
+        return True
+    key = version_key(version)
+
+    def constraint_key(text: str) -> tuple[int, ...]:
+        try:
+            return version_key(text)
+        except ResolveError:
+            raise ResolveError(f"Invalid version constraint {constraint!r}") from None
+
+    for part in constraint.split(","):
+        part = part.strip()
+        if not part or part == "*":
+            continue
+        if part[0] in "^~":
+            lower = constraint_key(part[1:])
+            if part[0] == "^":
+                # the first non-zero piece can't change
+                index = next((i for i, piece in enumerate(lower) if piece), len(lower) - 1)
+            else:
+                index = min(1, len(lower) - 1)
+            upper = lower[:index] + (lower[index] + 1,) + (0,) * (len(lower) - index - 1)
+            if not lower <= key < upper:
+                return False
+            continue
+        for operator in (">=", "<=", "==", "!=", ">", "<", "="):
+            if part.startswith(operator):
+                target = constraint_key(part[len(operator):])
+                break
+        else:
+            operator, target = "==", constraint_key(part)
+        if not {
+            ">=": key >= target, "<=": key <= target, "==": key == target, "=": key == target,
+            "!=": key != target, ">": key > target, "<": key < target,
+        }[operator]:
+            return False
+    return True
+
+
+def get_dependencies(mod: ModEntry) -> dict[str, str]:
+    dependencies = dict(mod.dependencies)
+    if mod.uuid not in BUILTIN_MODS:
+        dependencies.setdefault(CHAUFFEUR, "*")
+    return dependencies
+
+
+class InstallPlan(NamedTuple):
+    mods: list[ModEntry]
+    # uuid -> uuids of the mods in the plan it has to wait for
+    dependencies: dict[str, set[str]]
+
+    @property
+    def layers(self) -> list[list[ModEntry]]:
+        """The plan split into steps, where everything in a step only depends on earlier steps"""
+        remaining = {mod.uuid: mod for mod in self.mods}
+        done: set[str] = set()
+        layers = []
+        while remaining:
+            layer = [mod for uuid, mod in remaining.items() if self.dependencies[uuid] <= done]
+            layers.append(layer)
+            for mod in layer:
+                del remaining[mod.uuid]
+                done.add(mod.uuid)
+        return layers
+
+
+def resolve(requested: list[str], catalog: dict[str, ModEntry], installed: dict[str, str]) -> InstallPlan:
+    """
+    Work out what needs to be installed for the requested mods. catalog maps uuid to the latest entry of each mod and
+    installed maps uuid to installed version. Requested mods are always installed at their latest version, dependencies
+    only when what's installed doesn't satisfy every constraint on them.
+    """
+    catalog = {**BUILTIN_MODS, **catalog}
+    constraints: dict[str, list[tuple[str, str]]] = {}
+    edges: dict[str, dict[str, str]] = {}
+    pending = list(requested)
+    while pending:
+        uuid = pending.pop()
+        if uuid in edges:
+            continue
+        if uuid not in catalog:
+            wanted_by = ", ".join(source for source, constraint in constraints.get(uuid, []))
+            raise ResolveError(f"{uuid} is not in the catalog (required by {wanted_by or 'request'})")
+        edges[uuid] = get_dependencies(catalog[uuid])
+        for dependency, constraint in edges[uuid].items():
+            constraints.setdefault(dependency, []).append((uuid, constraint))
+            pending.append(dependency)
+
+    # depth first search for cycles, which would leave the plan without a valid order
+    visiting, visited = set(), set()
+    for root in edges:
+        if root in visited:
+            continue
+        stack = [(root, iter(edges[root]))]
+        path = [root]
+        visiting.add(root)
+        while stack:
+            uuid, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                path.pop()
+                visiting.discard(uuid)
+                visited.add(uuid)
+            elif child in visiting:
+                cycle = path[path.index(child):] + [child]
+                raise ResolveError(f"Dependency cycle: {' -> '.join(cycle)}")
+            elif child not in visited:
+                visiting.add(child)
+                path.append(child)
+                stack.append((child, iter(edges[child])))
+
+    to_install = []
+    requested_set = set(requested)
+    for uuid in edges:
+        mod = catalog[uuid]
+        mod_constraints = constraints.get(uuid, [])
+        if uuid not in requested_set and uuid in installed and all(
+                satisfies(installed[uuid], constraint) for source, constraint in mod_constraints):
+            continue
+        unsatisfied = [f"{source} wants {constraint}" for source, constraint in mod_constraints
+                       if not satisfies(mod.latest_version, constraint)]
+        if unsatisfied:
+            raise ResolveError(f"No version of {mod.name} satisfies every constraint: latest is {mod.latest_version}, "
+                               f"{'; '.join(unsatisfied)}")
+        to_install.append(mod)
+    planned = {mod.uuid for mod in to_install}
+    return InstallPlan(to_install, {mod.uuid: set(edges[mod.uuid]) & planned for mod in to_install})
+
+
+def installed_versions(game_dir: str, installed: Iterable[ModEntry]) -> dict[str, str]:
+    """Get the installed version of every mod, including the built in ones when they're installed"""
+    versions = {mod.uuid: mod.installed_version for mod in installed}
+    if chauffeur_installed(game_dir):
+        for uuid in BUILTIN_MODS:
+            manifest = get_manifest(game_dir, uuid)
+            # installed before manifests existed, so the version is unknown and assumed to be fine
+            versions.setdefault(uuid, manifest.version.lstrip("v") if manifest else "")
+    return versions
+
+
+def plan_install(game_dir: str, mods: list[ModEntry], catalog: Iterable[ModEntry],
+                 installed: Iterable[ModEntry]) -> InstallPlan:
+    """Plan installing mods along with whatever they depend on that isn't installed yet"""
+    installed = list(installed)
+    return resolve([mod.uuid for mod in mods], {mod.uuid: mod for mod in [*catalog, *installed, *mods]},
+                   installed_versions(game_dir, installed))
+
+
+def install_entry(game_dir: str, mod: ModEntry, progress: ProgressCallback | None = None) -> None:
+    if mod.uuid == BEPINEX:
+        install_bepin(game_dir, progress)
+    else:
+        install_mod(game_dir, mod.name, mod.download_url, mod.sha256, progress, mod.uuid, mod.latest_version,
+                    mod.files)
+
+
+def install_plan(
+        game_dir: str,
+        plan: InstallPlan,
+        max_workers: int = 3,
+        progress: ProgressCallback | None = None,
+        set_stage: Callable[[str], None] | None = None,
+        ) -> dict[str, Exception]:
+    """
+    Install everything in a plan. Each mod starts as soon as its dependencies are done, so independent branches
+    download and extract in parallel. Returns the errors for any mods that failed or were skipped, keyed by uuid.
+    """
+    errors: dict[str, Exception] = {}
+    waiting_on = {uuid: set(dependencies) for uuid, dependencies in plan.dependencies.items()}
+    mods = {mod.uuid: mod for mod in plan.mods}
+    finished = 0
+
+    def report(*args: int) -> None:
+        if progress:
+            progress(finished, len(mods))
+
+    def start(executor: ThreadPoolExecutor, uuid: str) -> Future:
+        if set_stage:
+            set_stage(f"Installing {mods[uuid].name}")
+        return executor.submit(install_entry, game_dir, mods[uuid], report)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = {start(executor, uuid): uuid for uuid, dependencies in waiting_on.items() if not dependencies}
+        for uuid in running.values():
+            del waiting_on[uuid]
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                uuid = running.pop(future)
+                finished += 1
+                try:
+                    future.result()
+                except Exception as e:
+                    logging.warning(f"Failed to install {mods[uuid].name}: {e}")
+                    errors[uuid] = e
+                try:
+                    report()
+                except BaseException:
+                    for pending in running:
+                        pending.cancel()
+                    raise
+            unfinished = waiting_on.keys() | set(running.values())
+            for uuid, dependencies in list(waiting_on.items()):
+                if dependencies & errors.keys():
+                    # skipping a mod can fail its own dependents, which get picked up on a later pass
+                    errors[uuid] = ResolveError(f"A dependency of {mods[uuid].name} failed to install")
+                    del waiting_on[uuid]
+                elif not dependencies & unfinished:
+                    del waiting_on[uuid]
+                    running[start(executor, uuid)] = uuid
+            if not running and waiting_on:
+                # only mods depending on skipped mods are left
+                for uuid in waiting_on:
+                    errors[uuid] = ResolveError(f"A dependency of {mods[uuid].name} failed to install")
+                waiting_on.clear()
+    return errors
+
+
+def install_chauffeur(game_dir: str, progress: ProgressCallback | None = None,
+                      set_stage: Callable[[str], None] | None = None) -> None:
+    """Install Chauffeur and everything it needs"""
+    errors = install_plan(game_dir, resolve([CHAUFFEUR], {}, {}), progress=progress, set_stage=set_stage)
+    if errors:
+        raise next(iter(errors.values()))
@@ -0,0 +1,128 @@
+"""
+In-memory search over the mod catalog. An inverted index maps every token in a mod's name, author, description and
+changelog to the mods containing it, so a query only touches the mods that actually match.
+"""
+import bisect
+import re
+from typing import Iterable
+
+from mods import ModEntry
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# how much a match in each field counts towards a mod's score
+FIELD_WEIGHTS = {"name": 8.0, "author": 4.0, "description": 2.0, "changelog": 1.0}
+PREFIX_WEIGHT = 0.6
+FUZZY_WEIGHT = 0.4
+# terms shorter than this are only prefix matched, fuzzy matching them matches nearly everything
+FUZZY_MIN_LENGTH = 4
+SHORT_TERM_LENGTH = 2
+SORT_MODES = ("relevance", "name", "author")
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def deletions(token: str) -> set[str]:
+    """Every variant of token with one character removed"""
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+class SearchIndex:
+    """Built once per catalog load. Searching is read only, so it's safe from any thread."""
+
+    def __init__(self, mods: Iterable[ModEntry]) -> None:
+        self.mods: dict[str, ModEntry] = {}
+        # catalog order, which is what relevance falls back to for equal scores
+        self.order: dict[str, int] = {}
+        # token -> uuid -> score
+        self.postings: dict[str, dict[str, float]] = {}
+        for mod in mods:
+            self.order[mod.uuid] = len(self.order)
+            self.mods[mod.uuid] = mod
+            fields = {
+                "name": mod.name,
+                "author": mod.author,
+                "description": mod.description,
+                "changelog": " ".join(mod.changelog),
+            }
+            counts: dict[str, float] = {}
+            for field, text in fields.items():
+                weight = FIELD_WEIGHTS[field]
+                for token in tokenize(text):
+                    counts[token] = counts.get(token, 0.0) + weight
+            for token, score in counts.items():
+                if token in self.postings:
+                    self.postings[token][mod.uuid] = score
+                else:
+                    self.postings[token] = {mod.uuid: score}
+        self.tokens = sorted(self.postings)
+        self._deletions: dict[str, list[str]] | None = None
+        # short terms are a prefix of most tokens, so their matches are worth keeping while typing
+        self._short_terms: dict[str, dict[str, float]] = {}
+
+    @property
+    def deletions(self) -> dict[str, list[str]]:
+        """
+        Maps one deletion of each token back to the token. One deletion of a term shares a variant with every token
+        within an edit of it. Only built once something is fuzzy matched.
+        """
+        if self._deletions is None:
+            variants: dict[str, list[str]] = {}
+            for token in self.tokens:
+                if len(token) >= FUZZY_MIN_LENGTH - 1:
+                    for variant in deletions(token) | {token}:
+                        variants.setdefault(variant, []).append(token)
+            self._deletions = variants
+        return self._deletions
+
+    def prefix_tokens(self, term: str) -> list[str]:
+        start = bisect.bisect_left(self.tokens, term)
+        end = bisect.bisect_left(self.tokens, term + "￿", start)
+        return self.tokens[start:end]
+
+    def fuzzy_tokens(self, term: str) -> set[str]:
+        """Tokens within roughly one typo of term"""
+        if len(term) < FUZZY_MIN_LENGTH:
+            return set()
+        matches = set()
+        for variant in deletions(term) | {term}:
+            matches.update(self.deletions.get(variant, ()))
+        return matches
+
+    def match_term(self, term: str) -> dict[str, float]:
+        if term in self._short_terms:
+            return self._short_terms[term]
+        scores: dict[str, float] = {}
+        weighted = {token: PREFIX_WEIGHT for token in self.prefix_tokens(term)}
+        for token in self.fuzzy_tokens(term):
+            weighted.setdefault(token, FUZZY_WEIGHT)
+        if term in self.postings:
+            weighted[term] = 1.0
+        for token, weight in weighted.items():
+            for uuid, score in self.postings[token].items():
+                scores[uuid] = max(scores.get(uuid, 0.0), score * weight)
+        if len(term) <= SHORT_TERM_LENGTH:
+            self._short_terms[term] = scores
+        return scores
+
+    def search(self, query: str, sort: str = "relevance") -> list[str]:
+        """Get the uuids of the mods matching every term in query, best match first unless sorted otherwise"""
+        terms = tokenize(query)
+        if terms:
+            scores: dict[str, float] | None = None
+            for term in sorted(set(terms), key=len, reverse=True):
+                term_scores = self.match_term(term)
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {uuid: score + term_scores[uuid] for uuid, score in scores.items() if uuid in term_scores}
+                if not scores:
+                    return []
+        else:
+            scores = dict.fromkeys(self.mods, 0.0)
+        if sort == "name":
+            return sorted(scores, key=lambda uuid: (self.mods[uuid].name.lower(), -scores[uuid]))
+        if sort == "author":
+            return sorted(scores, key=lambda uuid: (self.mods[uuid].author.lower(), -scores[uuid]))
+        return sorted(scores, key=lambda uuid: (-scores[uuid], self.order[uuid]))
@@ -0,0 +1,150 @@
+"""
+Content addressed store of installed mod files. Every file is kept once under objects/, named by its sha256, and every
+installed mod version is recorded as a package listing which objects go where. Packages can be copied back into the
+plugins folder, so switching between versions or profiles doesn't need the network. Objects are always copies, never
+hardlinks to installed files, so a mod writing to its own files can't change what the store holds. That makes every
+install a second copy, so the store only shrinks when pruned, see profiles.prune_store and `python cli.py prune`.
+"""
+import hashlib
+import os
+import shutil
+import threading
+import time
+from typing import NamedTuple
+
+from cache import load_json, save_json
+
+
+class Package(NamedTuple):
+    key: str
+    name: str
+    uuid: str
+    version: str
+    source: str
+    # path relative to the mod folder -> [size, sha256]
+    files: dict[str, list]
+    added: float
+
+
+def package_key(name: str, uuid: str, version: str) -> str:
+    return f"{uuid or name}@{version}"
+
+
+def copy_verified(source: str, destination: str, sha256: str, chunk_size: int = 1024 * 1024) -> None:
+    """Copy a file, raising ValueError if what was copied doesn't hash to sha256"""
+    file_hash = hashlib.sha256()
+    with open(source, "rb") as f, open(destination, "wb") as output:
+        while chunk := f.read(chunk_size):
+            file_hash.update(chunk)
+            output.write(chunk)
+    if file_hash.hexdigest() != sha256:
+        os.remove(destination)
+        raise ValueError(f"{source} does not match its sha256")
+
+
+def link_or_copy(source: str, destination: str) -> None:
+    try:
+        os.link(source, destination)
+    except OSError:
+        # different filesystems, or one that doesn't do hardlinks
+        shutil.copyfile(source, destination)
+
+
+class ModStore:
+    packages_name = "packages.json"
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._packages: dict[str, dict] | None = None
+
+    @property
+    def packages(self) -> dict[str, dict]:
+        if self._packages is None:
+            self._packages = load_json(os.path.join(self.directory, self.packages_name), {})
+        return self._packages
+
+    def object_path(self, sha256: str) -> str:
+        return os.path.join(self.directory, "objects", sha256[:2], sha256)
+
+    def add_file(self, path: str, sha256: str) -> None:
+        """Copy a file in as an object. Raises ValueError if it changed since it was hashed."""
+        object_path = self.object_path(sha256)
+        if os.path.isfile(object_path):
+            return
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        temp_path = f"{object_path}.{threading.get_ident()}.tmp"
+        copy_verified(path, temp_path, sha256)
+        os.replace(temp_path, object_path)
+
+    def add_package(self, folder: str, files: dict[str, list], name: str, uuid: str = "", version: str = "",
+                    source: str = "") -> Package:
+        """
+        Store a mod folder. files is its manifest from manifests.scan_folder. Files already in the store aren't
+        copied again, new ones are checked against the manifest's hashes as they're copied.
+        """
+        for relative_path, (size, mtime, sha256) in files.items():
+            self.add_file(os.path.join(folder, relative_path), sha256)
+        key = package_key(name, uuid, version)
+        package = {"name": name, "uuid": uuid, "version": version, "source": source,
+                   "files": {relative_path: [size, sha256] for relative_path, (size, mtime, sha256) in files.items()},
+                   "added": time.time()}
+        with self._lock:
+            self.packages[key] = package
+            save_json(os.path.join(self.directory, self.packages_name), self.packages)
+        return Package(key, **package)
+
+    def get_package(self, key: str) -> Package | None:
+        with self._lock:
+            package = self.packages.get(key)
+        return Package(key, **package) if package else None
+
+    def find_packages(self, name: str = "", uuid: str = "") -> list[Package]:
+        """Every stored version of a mod, newest first"""
+        with self._lock:
+            packages = [Package(key, **package) for key, package in self.packages.items()
+                        if (uuid and package["uuid"] == uuid) or (not uuid and package["name"] == name)]
+        return sorted(packages, key=lambda package: package.added, reverse=True)
+
+    def is_complete(self, package: Package) -> bool:
+        """Check every object of a package is there. Their content is checked when they're materialized."""
+        for size, sha256 in package.files.values():
+            try:
+                if os.stat(self.object_path(sha256)).st_size != size:
+                    return False
+            except FileNotFoundError:
+                return False
+        return True
+
+    def materialize(self, package: Package, folder: str) -> dict[str, list]:
+        """
+        Lay a package out in folder, returning its install manifest. Every object is checked against its hash as it's
+        copied, and a corrupt one raises ValueError and is dropped from the store.
+        """
+        files = {}
+        for relative_path, (size, sha256) in package.files.items():
+            path = os.path.join(folder, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                copy_verified(self.object_path(sha256), path, sha256)
+            except ValueError:
+                os.remove(self.object_path(sha256))
+                raise ValueError(f"{package.key} has a corrupt file {relative_path} in the mod store")
+            files[relative_path] = [size, os.stat(path).st_mtime_ns, sha256]
+        return files
+
+    def prune(self, keep: set[str]) -> int:
+        """Drop every package not in keep and every object no kept package uses, returning how many files went"""
+        with self._lock:
+            for key in list(self.packages):
+                if key not in keep:
+                    del self.packages[key]
+            save_json(os.path.join(self.directory, self.packages_name), self.packages)
+            used = {sha256 for package in self.packages.values() for size, sha256 in package["files"].values()}
+        removed = 0
+        for root, dirs, file_names in os.walk(os.path.join(self.directory, "objects")):
+            for file_name in file_names:
+                if file_name not in used:
+                    os.remove(os.path.join(root, file_name))
+                    removed += 1
+        return removed
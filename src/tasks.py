@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+def kivy_call_soon(func: Callable[..., Any], *args: Any) -> None:
+    """Run func on the kivy main loop on the next frame"""
+    from kivy.clock import Clock
+    Clock.schedule_once(lambda dt: func(*args))
+
+
+class Task:
+    """
+    Handle for a unit of work running on a TaskScheduler. The work function gets the task and should report through
+    `progress` and `set_stage`, which also raise TaskCancelled once the task is cancelled.
+    """
+    # minimum seconds between progress updates sent to the main thread
+    progress_interval = 0.1
+
+    def __init__(self, name: str, scheduler: "TaskScheduler",
+                 on_progress: Callable[["Task"], None] | None = None) -> None:
+        self.name = name
+        self.stage = "Queued"
+        self.done = 0
+        self.total = 0
+        self.future: Future | None = None
+        self._scheduler = scheduler
+        self._on_progress = on_progress
+        self._cancelled = threading.Event()
+        self._last_notify = 0.0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def status(self) -> str:
+        if self.total:
+            return f"{self.stage} {self.done * 100 // self.total}%"
+        return self.stage
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+        if self.future and self.future.cancel():
+            # it never started, so there's no run to report it
+            self._mark_cancelled()
+            self._scheduler.tasks.discard(self)
+
+    def _mark_cancelled(self) -> None:
+        self.stage = "Cancelled"
+        self.done = self.total = 0
+        self._notify()
+
+    def check_cancelled(self) -> None:
+        if self.cancelled:
+            raise TaskCancelled(self.name)
+
+    def set_stage(self, stage: str) -> None:
+        self.check_cancelled()
+        self.stage = stage
+        self.done = self.total = 0
+        self._notify()
+
+    def progress(self, done: int, total: int) -> None:
+        self.check_cancelled()
+        self.done = done
+        self.total = total
+        now = time.monotonic()
+        if done >= total or now - self._last_notify >= self.progress_interval:
+            self._last_notify = now
+            self._notify()
+
+    def _notify(self) -> None:
+        if self._on_progress:
+            self._scheduler.call_soon(self._on_progress, self)
+
+
+class TaskScheduler:
+    """Runs blocking work on a thread pool and hands the results back through `call_soon`"""
+
+    def __init__(self, max_workers: int = 4, call_soon: Callable[..., None] = kivy_call_soon) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chauffeur-task")
+        self.call_soon = call_soon
+        self.tasks: set[Task] = set()
+
+    def submit(
+            self,
+            name: str,
+            func: Callable[[Task], Any],
+            on_done: Callable[[Any], None] | None = None,
+            on_error: Callable[[BaseException], None] | None = None,
+            on_progress: Callable[[Task], None] | None = None,
+            ) -> Task:
+        task = Task(name, self, on_progress)
+        self.tasks.add(task)
+
+        def run() -> None:
+            try:
+                task.check_cancelled()
+                task.set_stage("Running")
+                result = func(task)
+                task.check_cancelled()
+            except TaskCancelled:
+                task._mark_cancelled()
+            except BaseException as e:
+                logging.exception(f"Task {name} failed")
+                task.stage = "Failed"
+                task.done = task.total = 0
+                task._notify()
+                if on_error:
+                    self.call_soon(on_error, e)
+            else:
+                task.stage = "Done"
+                if on_done:
+                    self.call_soon(on_done, result)
+            finally:
+                self.tasks.discard(task)
+
+        task.future = self.executor.submit(run)
+        return task
+
+    def shutdown(self) -> None:
+        for task in list(self.tasks):
+            task.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
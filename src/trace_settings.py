@@ -0,0 +1,45 @@
+"""
+Settings panel item summarizing recent traces, with a button to export them for bug reports. Only imported once the
+settings are opened.
+"""
+import os
+import time
+
+from kivy.app import App
+from kivy.clock import Clock
+from kivy.uix.button import Button
+from kivy.uix.settings import SettingNumeric
+
+import tracing
+from utils import local_path, open_file
+
+
+class SettingTrace(SettingNumeric):
+    """The value is how many minutes of tracing the summary covers"""
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.export_button = Button(text="Export trace", size_hint_x=0.6, on_release=lambda button: self.export())
+        self.add_widget(self.export_button)
+        self.bind(value=self.refresh)
+        self.refresh()
+        # keep the summary rolling while the settings are open
+        Clock.schedule_interval(lambda dt: self.get_root_window() and self.refresh(), 2)
+
+    def on_touch_down(self, touch) -> bool:
+        # the button shouldn't also open the popup for editing the value
+        if self.export_button.collide_point(*touch.pos):
+            return self.export_button.on_touch_down(touch)
+        return super().on_touch_down(touch)
+
+    def refresh(self, *args) -> None:
+        try:
+            window = float(self.value) * 60
+        except (TypeError, ValueError):
+            window = 300.0
+        self.desc = "\n".join(tracing.summarize(window)) or "Nothing recorded yet."
+
+    def export(self) -> None:
+        path = tracing.export_chrome_trace(local_path("data", "traces", f"trace-{time.strftime('%Y%m%d-%H%M%S')}.json"))
+        App.get_running_app().create_alert(f"Trace saved to {path}")
+        open_file(os.path.dirname(path))
@@ -0,0 +1,118 @@
+"""
+Lightweight tracing. Spans time a block of work and carry a few numbers about it, like bytes transferred or whether
+the http cache was hit. The most recent spans are kept in memory and can be exported as a Chrome trace
+(chrome://tracing or https://ui.perfetto.dev) or summarized for the settings screen.
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Iterator, NamedTuple, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+MAX_SPANS = 20000
+
+
+class Span(NamedTuple):
+    name: str
+    category: str
+    # perf_counter_ns at the start and the duration, both in nanoseconds
+    start: int
+    duration: int
+    thread: int
+    args: dict[str, Any]
+
+
+_spans: deque[Span] = deque(maxlen=MAX_SPANS)
+# unix time at perf_counter_ns zero, so exported traces have real timestamps
+_epoch = time.time_ns() - time.perf_counter_ns()
+
+
+@contextmanager
+def span(name: str, category: str, **args: Any) -> Iterator[dict[str, Any]]:
+    """Time the block. Yields the span's args, which the block can add to."""
+    start = time.perf_counter_ns()
+    try:
+        yield args
+    except BaseException as e:
+        args["error"] = type(e).__name__
+        raise
+    finally:
+        # deque appends are thread safe
+        _spans.append(Span(name, category, start, time.perf_counter_ns() - start, threading.get_ident(), args))
+
+
+def traced(category: str, name: str | None = None) -> Callable[[F], F]:
+    """Decorator for wrapping every call of a function in a span"""
+    def decorator(func: F) -> F:
+        span_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(span_name, category):
+                return func(*args, **kwargs)
+        return wrapper  # type: ignore
+    return decorator
+
+
+def get_spans() -> list[Span]:
+    return list(_spans)
+
+
+def clear() -> None:
+    _spans.clear()
+
+
+def export_chrome_trace(path: str) -> str:
+    """Write every recorded span as a Chrome trace event file, returning path"""
+    from cache import save_json
+
+    pid = os.getpid()
+    threads = {}
+    events = []
+    for recorded in get_spans():
+        tid = threads.setdefault(recorded.thread, len(threads) + 1)
+        events.append({
+            "name": recorded.name,
+            "cat": recorded.category,
+            "ph": "X",
+            "ts": (_epoch + recorded.start) / 1000,
+            "dur": recorded.duration / 1000,
+            "pid": pid,
+            "tid": tid,
+            "args": {key: value if isinstance(value, (int, float, bool)) else str(value)
+                     for key, value in recorded.args.items()},
+        })
+    events.extend({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": f"thread {tid}"}}
+                  for tid in threads.values())
+    save_json(path, {"traceEvents": events, "displayTimeUnit": "ms"})
+    return path
+
+
+def summarize(window: float = 300.0) -> list[str]:
+    """One line per kind of span over the last window seconds, slowest total first"""
+    cutoff = time.perf_counter_ns() - int(window * 1e9)
+    totals: dict[tuple[str, str], list] = {}
+    for recorded in get_spans():
+        if recorded.start < cutoff:
+            continue
+        # count, total ns, max ns, bytes, cache hits
+        total = totals.setdefault((recorded.category, recorded.name), [0, 0, 0, 0, 0])
+        total[0] += 1
+        total[1] += recorded.duration
+        total[2] = max(total[2], recorded.duration)
+        total[3] += recorded.args.get("bytes", 0)
+        total[4] += recorded.args.get("cache") in ("fresh", "revalidated", "offline")
+    lines = []
+    for (category, name), (count, duration, longest, transferred, hits) in sorted(
+            totals.items(), key=lambda item: item[1][1], reverse=True):
+        line = f"{category}/{name}: {count}x, {duration / 1e6:.0f} ms total, {longest / 1e6:.0f} ms max"
+        if transferred:
+            line += f", {transferred / 1024:.0f} KiB"
+        if hits:
+            line += f", {hits} cached"
+        lines.append(line)
+    return lines
@@ -1,16 +1,29 @@
-import io
+import hashlib
+import json
 import logging
-import mimetypes
 import os
 import shutil
 import subprocess
 import sys
-import urllib.request
+import tempfile
+import threading
+import time
 import zipfile
-from typing import Any, NamedTuple
-from zipfile import ZipFile
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+from typing import Any, Callable, NamedTuple, TYPE_CHECKING
+from urllib.parse import quote, urlencode
 
-import requests
+
+from cache import HTTPCache, VersionIndex
+from delta import PatchError, apply_patch
+from extract import extract_zip
+from manifests import get_manifest, hash_file, mod_file_path, record_install, scan_folder
+from pe import get_file_version
+from store import ModStore, link_or_copy
+from tracing import span, traced
+
+if TYPE_CHECKING:
+    import requests
 
 __version__ = "0.1.0"
 
@@ -18,6 +31,27 @@ is_linux = sys.platform.startswith("linux")
 is_macos = sys.platform == "darwin"
 is_windows = sys.platform in ("win32", "cygwin", "msys")
 
+MMHOOK_URL = "https://github.com/harbingerofme/Bepinex.Monomod.HookGenPatcher/releases/download/1.2.1/Release.zip"
+CHAUFFEUR_URL = "https://github.com/alwaysintreble/Chauffeur/releases/download/v0.2.0/Chauffeur.dll"
+MODLIST_URL = "https://raw.githubusercontent.com/alwaysintreble/chauffeur_mod_manager/refs/heads/modlist"
+AVAILABLE_MODS_URL = f"{MODLIST_URL}/available-mods.json"
+# every mod's latest version in one file, see get_catalog
+CATALOG_URL = f"{MODLIST_URL}/catalog.json"
+BEPINEX_RELEASES_URL = "https://api.github.com/repos/BepInEx/BepInEx/releases"
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (10, 30)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# longest Retry-After honored, so a server can't park a worker thread where cancelling can't reach it
+MAX_RETRY_AFTER = 5.0
+# a mirror is on the LAN, so give up on it quickly and go upstream
+MIRROR_TIMEOUT = (2, 30)
+# seconds to stop trying a mirror for after it couldn't be reached
+MIRROR_RETRY_DELAY = 60
+
+# called with (done, total) as work progresses. may raise to abort the work
+ProgressCallback = Callable[[int, int], None]
+
 
 class Version(NamedTuple):
     major: int
@@ -48,50 +82,392 @@ def open_file(filename: "str | pathlib.Path") -> None:
         subprocess.call([open_command, filename])
 
 
-def request_data(request_url: str) -> Any:
-    """Fetches json response from given url"""
-    logging.info(f"requesting {request_url}")
-    response = requests.get(request_url)
-    if response.status_code == 200:  # success
-        return response.json()
-    raise RuntimeError(f"Unable to fetch data. (status code {response.status_code})")
+class HTTPStatusError(RuntimeError):
+    def __init__(self, status_code: int) -> None:
+        super().__init__(f"Unable to fetch data. (status code {status_code})")
+        self.status_code = status_code
+
+
+_session: "requests.Session | None" = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> "requests.Session":
+    """
+    Get the http session shared by everything in utils. It keeps connections alive per host and retries 429/5xx
+    responses with exponential backoff, honoring Retry-After up to MAX_RETRY_AFTER. A host refusing connections is
+    only retried once.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            class CappedRetry(Retry):
+                def get_retry_after(self, response: Any) -> float | None:
+                    retry_after = super().get_retry_after(response)
+                    return None if retry_after is None else min(retry_after, MAX_RETRY_AFTER)
+
+                def get_backoff_time(self) -> float:
+                    # rather than backoff_max, which urllib3 1.26 doesn't take
+                    return min(super().get_backoff_time(), MAX_RETRY_AFTER)
+
+            retry = CappedRetry(
+                total=5,
+                connect=1,
+                backoff_factor=0.5,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset({"GET", "HEAD"}),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=retry)
+            _session = requests.Session()
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+            _session.headers["User-Agent"] = f"ChauffeurModManager/{__version__}"
+        return _session
+
+
+# base url of another instance serving mirror.py, tried before upstream. see set_mirror
+_mirror_base = ""
+_mirror_failed_at = 0.0
+
+
+def set_mirror(base_url: str) -> None:
+    """Try a LAN mirror before upstream for every request and download. An empty url turns the mirror off."""
+    global _mirror_base, _mirror_failed_at
+    base_url = base_url.strip().strip('"').rstrip("/")
+    if base_url and "://" not in base_url:
+        base_url = f"http://{base_url}"
+    _mirror_base = base_url
+    _mirror_failed_at = 0.0
+    if base_url:
+        from requests.adapters import HTTPAdapter
+        # no retries, upstream is the fallback
+        get_session().mount(f"{base_url}/", HTTPAdapter(pool_connections=1, pool_maxsize=16, max_retries=0))
+
+
+def mirror_url(url: str, kind: str, sha256: str = "") -> str | None:
+    """
+    Get where the mirror serves url, kind being "data" for json or "files" for downloads. Returns None if there's no
+    mirror, or it couldn't be reached recently.
+    """
+    if not _mirror_base or (_mirror_failed_at and time.monotonic() - _mirror_failed_at < MIRROR_RETRY_DELAY):
+        return None
+    scheme, _, rest = url.partition("://")
+    mirrored = f"{_mirror_base}/{kind}/{scheme}/{quote(rest, safe='/')}"
+    return f"{mirrored}?{urlencode({'sha256': sha256})}" if sha256 else mirrored
+
+
+def mirror_failed(url: str, error: BaseException) -> None:
+    global _mirror_failed_at
+    logging.warning(f"Mirror unavailable, going upstream for {MIRROR_RETRY_DELAY} seconds. ({url}: {error})")
+    _mirror_failed_at = time.monotonic()
+
+
+def request_data(request_url: str, timeout: float | tuple[float, float] = DEFAULT_TIMEOUT,
+                 use_mirror: bool = True) -> Any:
+    """Fetches json response from given url, going through the http cache and the mirror if one is set"""
+    with span("request", "http", url=request_url) as trace:
+        entry = http_cache.get(request_url)
+        if entry and (http_cache.offline or http_cache.is_fresh(entry)):
+            trace["cache"] = "offline" if http_cache.offline else "fresh"
+            return json.loads(http_cache.read(request_url))
+        if http_cache.offline:
+            raise RuntimeError(f"{request_url} is not cached and offline mode is enabled.")
+        logging.info(f"requesting {request_url}")
+        import requests
+        response = None
+        mirrored = mirror_url(request_url, "data") if use_mirror else None
+        if mirrored:
+            try:
+                response = get_session().get(mirrored, headers=http_cache.conditional_headers(entry),
+                                             timeout=MIRROR_TIMEOUT)
+            except requests.RequestException as e:
+                mirror_failed(mirrored, e)
+            else:
+                # the mirror asked upstream for anything it didn't have, so only its 404s are worth believing
+                if response.status_code not in (200, 304, 404):
+                    logging.info(f"Mirror couldn't get {request_url}, going upstream. ({response.status_code})")
+                    response = None
+                else:
+                    trace["mirror"] = True
+        try:
+            if response is None:
+                response = get_session().get(request_url, headers=http_cache.conditional_headers(entry),
+                                             timeout=timeout)
+        except requests.RequestException as e:
+            if entry:
+                logging.warning(f"Unable to reach {request_url}, using cached data. ({e})")
+                trace["cache"] = "stale"
+                return json.loads(http_cache.read(request_url))
+            raise
+        trace["status"] = response.status_code
+        trace["bytes"] = len(response.content)
+        if response.status_code == 304 and entry:  # not modified
+            trace["cache"] = "revalidated"
+            http_cache.revalidated(request_url, response.headers)
+            return json.loads(http_cache.read(request_url))
+        if response.status_code == 200:  # success
+            trace["cache"] = "miss"
+            data = response.json()
+            http_cache.store(request_url, response.content, response.headers)
+            return data
+        raise HTTPStatusError(response.status_code)
 
 
 def get_available_mods() -> dict[str, dict[str, str]]:
     """Get available mods from repo manifest. Returned as [name, url]"""
-    available_mods_url = "https://raw.githubusercontent.com/alwaysintreble/chauffeur_mod_manager/refs/heads/modlist/available-mods.json"
-    return request_data(available_mods_url)
-
-
-def install_mod(game_path: str, mod_name: str, download_url: str, expected_hash: str = "") -> None:
-    with urllib.request.urlopen(download_url) as download:
-        file_type, _ = mimetypes.guess_type(download_url)
-        file_data = download.read()
-        file_bytes = io.BytesIO(file_data)
-        # if expected_hash:
-        #     sha256_hash = hashlib.sha256()
-        #     with open(file_data, "rb") as f:
-        #         for byte_block in iter(lambda: f.read(4096), b""):
-        #             sha256_hash.update(byte_block)
-        #         if not sha256_hash.hexdigest() == expected_hash:
-        #             raise ValueError("File hash does not match expected.")
-        destination_folder = os.path.join(game_path, "BepInEx", "plugins", mod_name)
-        os.makedirs(destination_folder, exist_ok=True)
-        if zipfile.is_zipfile(file_bytes):
-            with ZipFile(file_bytes, "r") as zip_file:
-                for member in zip_file.infolist():
-                    new_name = member.filename.split("/")[-1]
-                    with zip_file.open(member) as source_file:
-                        with open(os.path.join(destination_folder, new_name), "wb") as target_file:
-                            target_file.write(source_file.read())
+    return request_data(AVAILABLE_MODS_URL)
+
+
+class Catalog(NamedTuple):
+    # changes whenever anything in the catalog does
+    revision: str
+    # the same as get_available_mods
+    index_data: dict[str, dict[str, Any]]
+    # uuid -> the latest entry of the mod's versions manifest, without the changelog
+    latest: dict[str, dict[str, Any]]
+
+
+# when the repo last turned out not to have an aggregated catalog, so it's only asked for again once in a while
+_catalog_missing_at: float | None = None
+# the same as the app's default refresh interval
+CATALOG_RETRY_INTERVAL = 30 * 60
+
+
+def get_catalog() -> Catalog | None:
+    """
+    Get the aggregated catalog, which has every mod's latest version in a single file, shaped like
+    {"revision": str, "mods": {uuid: {...index data, "latest": {"mod_version", "download_url", "sha256"}}}}. The index
+    data still has each mod's versions_url, which is only needed for changelogs.
+    Returns None if the repo only has the per mod versions manifests.
+    """
+    global _catalog_missing_at
+    if _catalog_missing_at is not None and time.monotonic() - _catalog_missing_at < CATALOG_RETRY_INTERVAL:
+        return None
+    try:
+        data = request_data(CATALOG_URL)
+    except HTTPStatusError as e:
+        if e.status_code != 404:
+            raise
+        _catalog_missing_at = time.monotonic()
+        return None
+    _catalog_missing_at = None
+    index_data = {}
+    latest = {}
+    for uuid, mod_data in data["mods"].items():
+        mod_data = dict(mod_data)
+        latest[uuid] = mod_data.pop("latest")
+        index_data[uuid] = mod_data
+    return Catalog(str(data.get("revision", "")), index_data, latest)
+
+
+def download_file(download_url: str, destination: str, expected_hash: str = "", chunk_size: int = 64 * 1024,
+                  progress: ProgressCallback | None = None, max_resumes: int = 5, use_mirror: bool = True) -> str:
+    """
+    Stream a download to disk in chunks, hashing it as it goes. Returns the sha256 of the file and raises a ValueError
+    if it doesn't match expected_hash. If the connection drops the download resumes from where it stopped with a Range
+    request, up to max_resumes times. If a mirror is set it's tried first, and anything going wrong with it falls back
+    to download_url.
+    """
+    import requests
+    mirrored = mirror_url(download_url, "files", expected_hash) if use_mirror else None
+    if mirrored:
+        try:
+            return fetch_file(mirrored, destination, expected_hash, chunk_size, progress, min(max_resumes, 1),
+                              MIRROR_TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            mirror_failed(mirrored, e)
+        except (requests.RequestException, ValueError) as e:
+            logging.warning(f"Mirror couldn't provide {download_url}, going upstream. ({e})")
+    return fetch_file(download_url, destination, expected_hash, chunk_size, progress, max_resumes)
+
+
+def fetch_file(download_url: str, destination: str, expected_hash: str = "", chunk_size: int = 64 * 1024,
+               progress: ProgressCallback | None = None, max_resumes: int = 5,
+               timeout: float | tuple[float, float] = DEFAULT_TIMEOUT) -> str:
+    """The download part of download_file, without the mirror"""
+    import requests
+    sha256_hash = hashlib.sha256()
+    done = 0
+    total = 0
+    resumes = 0
+    with span("download", "http", url=download_url) as trace, open(destination, "wb") as f:
+        while True:
+            # ranges are byte offsets into the encoded body, so don't let the server compress it
+            headers = {"Accept-Encoding": "identity"}
+            if done:
+                headers["Range"] = f"bytes={done}-"
+            try:
+                with get_session().get(download_url, headers=headers, stream=True, timeout=timeout) as download:
+                    if done and download.status_code != 206:
+                        # the server ignored the range so start over
+                        f.seek(0)
+                        f.truncate()
+                        sha256_hash = hashlib.sha256()
+                        done = 0
+                    download.raise_for_status()
+                    if download.status_code == 206:
+                        total = int(download.headers.get("Content-Range", "/0").rsplit("/", 1)[-1] or 0)
+                    else:
+                        total = int(download.headers.get("Content-Length") or 0)
+                    for chunk in download.iter_content(chunk_size):
+                        sha256_hash.update(chunk)
+                        f.write(chunk)
+                        done += len(chunk)
+                        if progress:
+                            progress(done, max(total, done))
+                if done < total:
+                    raise requests.exceptions.ChunkedEncodingError(f"Got {done} of {total} bytes")
+                break
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                resumes += 1
+                if resumes > max_resumes:
+                    raise
+                logging.warning(f"Download of {download_url} interrupted at {done} bytes, resuming. ({e})")
+        trace["bytes"] = done
+        trace["resumes"] = resumes
+    file_hash = sha256_hash.hexdigest()
+    if expected_hash and file_hash != expected_hash.lower():
+        raise ValueError(f"File hash does not match expected for {download_url}.")
+    return file_hash
+
+
+def replace_folder(source: str, destination: str) -> None:
+    """Move source to destination, replacing whatever was there. Both must be on the same filesystem."""
+    if not os.path.exists(destination):
+        os.replace(source, destination)
+        return
+    backup = f"{source}.old"
+    os.replace(destination, backup)
+    try:
+        os.replace(source, destination)
+    except OSError:
+        os.replace(backup, destination)
+        raise
+    shutil.rmtree(backup, ignore_errors=True)
+
+
+def swap_in_mod(game_path: str, staged_folder: str, files: dict[str, list], mod_name: str, mod_uuid: str = "",
+                mod_version: str = "", source: str = "") -> None:
+    """Move a fully staged mod into the plugins folder, keeping a copy in the mod store and recording the install"""
+    try:
+        mod_store.add_package(staged_folder, files, mod_name, mod_uuid, mod_version, source)
+    except (OSError, ValueError) as e:
+        # only costs the ability to switch back to this version offline
+        logging.warning(f"Unable to add {mod_name} to the mod store: {e}")
+    plugins_folder = os.path.join(game_path, "BepInEx", "plugins")
+    os.makedirs(plugins_folder, exist_ok=True)
+    replace_folder(staged_folder, os.path.join(plugins_folder, mod_name))
+    record_install(game_path, mod_name, files, mod_uuid, mod_version, source)
+
+
+def install_mod(game_path: str, mod_name: str, download_url: str, expected_hash: str = "",
+                progress: ProgressCallback | None = None, mod_uuid: str = "", mod_version: str = "",
+                files: dict[str, dict] | None = None) -> None:
+    """
+    Download and install a mod into BepInEx/plugins/mod_name. The mod is staged next to the plugins folder and then
+    swapped in, so a failed download or extraction never leaves a half installed mod behind. What was installed is
+    recorded in the game's install manifest. If the version publishes its files and an older version is installed,
+    only the files that changed are fetched, see update_mod_files.
+    """
+    if files and get_manifest(game_path, mod_name):
+        try:
+            update_mod_files(game_path, mod_name, files, progress, mod_uuid, mod_version, download_url)
+            return
+        except (OSError, ValueError) as e:
+            logging.warning(f"Delta update of {mod_name} failed, downloading the whole mod. ({e})")
+    staging_folder = os.path.join(game_path, "BepInEx", ".staging")
+    os.makedirs(staging_folder, exist_ok=True)
+    with span("install_mod", "install", mod=mod_name), tempfile.TemporaryDirectory(dir=staging_folder) as temp_dir:
+        file_name = download_url.split("/")[-1]
+        download_path = os.path.join(temp_dir, file_name)
+        download_file(download_url, download_path, expected_hash, progress=progress)
+        staged_folder = os.path.join(temp_dir, mod_name)
+        os.makedirs(staged_folder)
+        if zipfile.is_zipfile(download_path):
+            extract_zip(download_path, staged_folder, flatten=True)
         else:
-            with open(os.path.join(destination_folder, download_url.split("/")[-1]), "wb") as f:
-                shutil.copyfileobj(download, f)
+            shutil.copyfile(download_path, os.path.join(staged_folder, file_name))
+        swap_in_mod(game_path, staged_folder, scan_folder(staged_folder), mod_name, mod_uuid, mod_version,
+                    download_url)
+
+
+def update_mod_files(game_path: str, mod_name: str, files: dict[str, dict], progress: ProgressCallback | None = None,
+                     mod_uuid: str = "", mod_version: str = "", source: str = "") -> int:
+    """
+    Update an installed mod to the version described by files, its published file manifest of path relative to the mod
+    folder -> {"size", "sha256", "url", "patches": {old sha256: patch url}}. Files whose hash is already installed are
+    reused, changed files are patched from the installed file when there's a patch for its hash and downloaded whole
+    otherwise. Every file is checked against its sha256. Returns the number of bytes downloaded.
+    """
+    manifest = get_manifest(game_path, mod_name)
+    if manifest is None:
+        raise ValueError(f"{mod_name} has no install manifest to update from")
+    mod_folder = os.path.join(game_path, "BepInEx", "plugins", mod_name)
+    # sha256 -> path of every installed file that still matches its manifest
+    installed: dict[str, str] = {}
+    for relative_path, (size, mtime, sha256) in manifest.files.items():
+        try:
+            path = mod_file_path(mod_folder, relative_path)
+            stat = os.stat(path)
+        except (FileNotFoundError, ValueError):
+            continue
+        if stat.st_size == size and (stat.st_mtime_ns == mtime or hash_file(path) == sha256):
+            installed[sha256] = path
+    staging_folder = os.path.join(game_path, "BepInEx", ".staging")
+    os.makedirs(staging_folder, exist_ok=True)
+    downloaded = 0
+    reused = 0
+    with span("update_mod", "install", mod=mod_name) as trace, \
+            tempfile.TemporaryDirectory(dir=staging_folder) as temp_dir:
+        staged_folder = os.path.join(temp_dir, mod_name)
+        staged_files = {}
+        for i, (relative_path, entry) in enumerate(files.items()):
+            # the manifest comes from the network, so it mustn't be able to write outside the mod
+            path = mod_file_path(staged_folder, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            sha256 = entry["sha256"].lower()
+            if sha256 in installed:
+                link_or_copy(installed[sha256], path)
+                reused += 1
+            else:
+                downloaded += patch_or_download(entry, installed, path, os.path.join(temp_dir, f"{i}.download"))
+            staged_files[relative_path] = [entry["size"], os.stat(path).st_mtime_ns, sha256]
+            if progress:
+                progress(i + 1, len(files))
+        trace["bytes"] = downloaded
+        trace["reused"] = reused
+        swap_in_mod(game_path, staged_folder, staged_files, mod_name, mod_uuid, mod_version, source)
+    return downloaded
+
+
+def patch_or_download(entry: dict[str, Any], installed: dict[str, str], destination: str, temp_path: str) -> int:
+    """Get one file of an update, from a patch against an installed file if one is published. Returns bytes fetched."""
+    for old_hash, patch_url in entry.get("patches", {}).items():
+        if old_hash.lower() not in installed:
+            continue
+        try:
+            download_file(patch_url, temp_path)
+            with open(installed[old_hash.lower()], "rb") as old, open(temp_path, "rb") as patch:
+                new = apply_patch(old.read(), patch.read(), entry["sha256"])
+            with open(destination, "wb") as f:
+                f.write(new)
+            return os.path.getsize(temp_path)
+        except (OSError, PatchError) as e:
+            logging.warning(f"Patching {os.path.basename(destination)} failed, downloading it whole. ({e})")
+        break
+    download_file(entry["url"], destination, entry["sha256"])
+    return os.path.getsize(destination)
 
 
-def install_bepin(game_path: str) -> None:
-    bepin_url: str = "https://api.github.com/repos/BepInEx/BepInEx/releases"
-    data = request_data(bepin_url)
+@traced("install")
+def install_bepin(game_path: str, progress: ProgressCallback | None = None) -> None:
+    data = request_data(BEPINEX_RELEASES_URL)
     for release in data:
         if release["prerelease"]:
             continue
@@ -107,37 +483,34 @@ def install_bepin(game_path: str) -> None:
         raise ValueError
     download_url = asset["browser_download_url"]
 
-    with urllib.request.urlopen(download_url) as download:
-        with ZipFile(io.BytesIO(download.read()), "r") as zip_file:
-            for member in zip_file.infolist():
-                zip_file.extract(member, path=game_path)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        download_path = os.path.join(temp_dir, asset["name"])
+        download_file(download_url, download_path, progress=progress)
+        extract_zip(download_path, game_path, progress=progress)
     os.makedirs(os.path.join(game_path, "BepInEx", "plugins"), exist_ok=True)
+    # BepInEx lives in the game folder rather than plugins, so only its version is recorded for the resolver
+    record_install(game_path, "BepInEx", {}, "BepInEx", release["tag_name"].lstrip("v"), download_url)
 
 
-def get_installed_mod_version(mod_name: str, game_path: str) -> str:
-    from win32api import GetFileVersionInfo, LOWORD, HIWORD
+def read_dll_version(file_path: str) -> str:
+    """Read the FileVersion of a dll as major.minor.build"""
+    return ".".join(str(i) for i in get_file_version(file_path)[:3])
+
 
+def get_installed_mod_version(mod_name: str, game_path: str) -> str:
+    manifest = get_manifest(game_path, mod_name)
+    if manifest and manifest.version:
+        return manifest.version.lstrip("v")
     mod_path = os.path.join(game_path, "BepInEx", "plugins", mod_name)
     possible_files = [file for file in os.listdir(mod_path) if file.endswith(".dll")]
     potential_name = "".join(mod_name.split(" ")) + ".dll"
     if len(possible_files) == 1:
-        installed_version_info = GetFileVersionInfo(
-            os.path.join(mod_path, possible_files[0]),
-            "\\",
-        )
+        dll_path = os.path.join(mod_path, possible_files[0])
     elif potential_name in possible_files:
-        installed_version_info = GetFileVersionInfo(
-            os.path.join(mod_path, potential_name),
-            "\\",
-        )
+        dll_path = os.path.join(mod_path, potential_name)
     else:
         raise ValueError("I'm not sure what to do here without adding fuzzy matching")
-    ms = installed_version_info["FileVersionMS"]
-    ls = installed_version_info["FileVersionLS"]
-    version = (HIWORD(ms), LOWORD(ms), HIWORD(ls))
-    installed_version = ".".join(str(i) for i in version)
-
-    return installed_version
+    return version_index.get(dll_path, read_dll_version)
 
 
 def get_remote_mod_version(mod_data: dict[str, str]) -> tuple[dict[str, str], list[dict[str, str]]]:
@@ -146,6 +519,46 @@ def get_remote_mod_version(mod_data: dict[str, str]) -> tuple[dict[str, str], li
     return version_info[0], version_info
 
 
+def get_remote_mod_versions(
+        index_data: dict[str, dict[str, str]],
+        max_workers: int = 8,
+        timeout: float = 10.0,
+        progress: ProgressCallback | None = None,
+        deadline: float = 60.0,
+        ) -> dict[str, tuple[dict[str, str], list[dict[str, str]]]]:
+    """
+    Fetch the versions manifest of every mod in the index concurrently. Mods whose manifest can't be fetched are
+    logged and left out of the result, so one dead `versions_url` doesn't take the whole catalog down with it. Neither
+    do slow ones, anything not fetched within deadline seconds is left out too.
+    """
+    def fetch(mod_data: dict[str, str]) -> tuple[dict[str, str], list[dict[str, str]]]:
+        version_info = request_data(mod_data["versions_url"], timeout)["versions"]
+        return version_info[0], version_info
+
+    results: dict[str, tuple[dict[str, str], list[dict[str, str]]]] = {}
+    if index_data:
+        executor = ThreadPoolExecutor(max_workers=min(max_workers, len(index_data)))
+        futures = {executor.submit(fetch, data): mod for mod, data in index_data.items()}
+        try:
+            for i, future in enumerate(as_completed(futures, timeout=deadline), 1):
+                mod = futures[future]
+                try:
+                    results[mod] = future.result()
+                except Exception as e:
+                    logging.warning(f"Unable to fetch versions for {mod}: {e}")
+                if progress:
+                    progress(i, len(futures))
+        except FuturesTimeoutError:
+            missing = [mod for future, mod in futures.items() if not future.done()]
+            logging.warning(f"Gave up on the versions of {len(missing)} mods after {deadline} seconds: {missing}")
+        finally:
+            # don't wait on anything still hanging, it finishes in the background
+            executor.shutdown(wait=False, cancel_futures=True)
+    # cache hits only touched access times, so write them once for the whole batch
+    http_cache.save()
+    return results
+
+
 def available_mod_update(mod_name: str, game_path: str, latest_version: str) -> bool:
     """Check if there's an available update for this mod"""
     latest_version = latest_version.lstrip("v")
@@ -175,6 +588,10 @@ def local_path(*path: str) -> str:
     return os.path.join(local_path.cached_path, *path)  # type: ignore
 
 
+http_cache = HTTPCache(local_path("data", "cache", "http"))
+version_index = VersionIndex(local_path("data", "cache", "versions.json"))
+mod_store = ModStore(local_path("data", "store"))
+
 
 class Config(NamedTuple):
     game_path: str
@@ -0,0 +1,232 @@
+"""
+Watches BepInEx/plugins for mods being added, removed or changed outside of the app. Uses inotify on Linux and falls
+back to polling elsewhere. Events are debounced and coalesced per mod folder, so extracting a mod with hundreds of files
+is reported as one change once things go quiet.
+"""
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, NamedTuple
+
+from manifests import forget_mod, get_manifest, verify_mod
+from utils import get_installed_mod_version, get_installed_mods, version_index
+
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE |
+              IN_DELETE_SELF | IN_MOVE_SELF)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class PluginChanges(NamedTuple):
+    added: set[str]
+    removed: set[str]
+    modified: set[str]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.modified)
+
+
+def folder_signature(path: str) -> tuple:
+    """Cheap fingerprint of a mod folder for polling: its files' names, sizes and mtimes"""
+    signature = []
+    for root, dirs, files in os.walk(path):
+        for file_name in files:
+            try:
+                stat = os.stat(os.path.join(root, file_name))
+            except FileNotFoundError:
+                continue
+            signature.append((os.path.relpath(os.path.join(root, file_name), path), stat.st_size, stat.st_mtime_ns))
+    return tuple(sorted(signature))
+
+
+class PluginWatcher:
+    """
+    Calls on_change from the watcher thread with the mod folders that changed, debounce seconds after the last event.
+    mods is always the current set of mod folders, so callers don't have to list the folder themselves.
+    """
+
+    def __init__(self, game_path: str, on_change: Callable[[PluginChanges], None], debounce: float = 0.5,
+                 poll_interval: float = 2.0) -> None:
+        self.game_path = game_path
+        self.plugins_folder = os.path.join(game_path, "BepInEx", "plugins")
+        self.on_change = on_change
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.mods = set(get_installed_mods(game_path)) if os.path.isdir(self.plugins_folder) else set()
+        self._touched: set[str] = set()
+        self._last_event = 0.0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._inotify_fd = -1
+        # watch descriptor -> folder relative to plugins
+        self._watches: dict[int, str] = {}
+        self._libc: ctypes.CDLL | None = None
+
+    def start(self) -> None:
+        if sys.platform.startswith("linux") and self._start_inotify():
+            target = self._run_inotify
+        else:
+            target = self._run_polling
+        self._thread = threading.Thread(target=target, name="PluginWatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        if self._inotify_fd >= 0:
+            os.close(self._inotify_fd)
+            self._inotify_fd = -1
+
+    @property
+    def using_inotify(self) -> bool:
+        return self._inotify_fd >= 0
+
+    def _start_inotify(self) -> bool:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return False
+        if fd < 0:
+            return False
+        self._libc = libc
+        self._inotify_fd = fd
+        if not self._add_watch(""):
+            os.close(fd)
+            self._inotify_fd = -1
+            return False
+        return True
+
+    def _add_watch(self, relative_folder: str) -> bool:
+        """Watch a folder and everything under it"""
+        path = os.path.join(self.plugins_folder, relative_folder)
+        wd = self._libc.inotify_add_watch(self._inotify_fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            logging.debug(f"Unable to watch {path}: {os.strerror(ctypes.get_errno())}")
+            return False
+        self._watches[wd] = relative_folder
+        try:
+            for entry in os.scandir(path):
+                if entry.is_dir(follow_symlinks=False):
+                    self._add_watch(os.path.join(relative_folder, entry.name))
+        except FileNotFoundError:
+            # already gone again, its events will say so
+            pass
+        return True
+
+    def _run_inotify(self) -> None:
+        while not self._stop.is_set():
+            timeout = self.debounce if self._touched else 1.0
+            readable, _, _ = select.select([self._inotify_fd], [], [], timeout)
+            if readable:
+                try:
+                    self._read_events(os.read(self._inotify_fd, 64 * 1024))
+                except BlockingIOError:
+                    pass
+            self._flush_if_quiet()
+
+    def _read_events(self, data: bytes) -> None:
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                # too much happened to know what, so check everything
+                self._touched.update(self.mods, os.listdir(self.plugins_folder))
+                continue
+            folder = self._watches.get(wd)
+            if folder is None:
+                continue
+            if mask & IN_IGNORED:
+                del self._watches[wd]
+                continue
+            relative_path = os.path.join(folder, os.fsdecode(name)) if name else folder
+            if not relative_path:
+                continue
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self._add_watch(relative_path)
+            self._touched.add(relative_path.split(os.sep, 1)[0])
+            self._last_event = time.monotonic()
+
+    def _run_polling(self) -> None:
+        signatures = {mod: folder_signature(os.path.join(self.plugins_folder, mod)) for mod in self.mods}
+        while not self._stop.wait(self.poll_interval):
+            current = set(get_installed_mods(self.game_path)) if os.path.isdir(self.plugins_folder) else set()
+            for mod in current | set(signatures):
+                signature = folder_signature(os.path.join(self.plugins_folder, mod)) if mod in current else None
+                if signatures.get(mod) != signature:
+                    self._touched.add(mod)
+                    if signature is None:
+                        signatures.pop(mod, None)
+                    else:
+                        signatures[mod] = signature
+            # polling is already slower than any debounce
+            self._last_event = 0.0
+            self._flush_if_quiet()
+
+    def _flush_if_quiet(self) -> None:
+        if not self._touched or time.monotonic() - self._last_event < self.debounce:
+            return
+        touched, self._touched = self._touched, set()
+        changes = PluginChanges(set(), set(), set())
+        for mod in touched:
+            path = os.path.join(self.plugins_folder, mod)
+            exists = os.path.isdir(path) and mod not in ("MMHOOK", "Chauffeur")
+            if exists and mod in self.mods:
+                changes.modified.add(mod)
+            elif exists:
+                changes.added.add(mod)
+            elif mod in self.mods:
+                changes.removed.add(mod)
+        self.mods = (self.mods | changes.added) - changes.removed
+        if changes:
+            try:
+                self.on_change(changes)
+            except Exception:
+                logging.exception("Plugin change handler failed")
+
+
+def sync_plugin_changes(game_path: str, changes: PluginChanges) -> dict[str, str | None]:
+    """
+    Bring the version index and manifests up to date with changed mod folders, returning the installed version of each.
+    Removed folders get None and ones without a readable version yet, like a mod still being copied in, get "".
+    """
+    versions: dict[str, str | None] = {}
+    plugins_folder = os.path.join(game_path, "BepInEx", "plugins")
+    for mod in changes.removed:
+        version_index.discard_folder(os.path.join(plugins_folder, mod))
+        if get_manifest(game_path, mod):
+            # removed by hand, the manifest only describes files that are gone
+            forget_mod(game_path, mod)
+        versions[mod] = None
+    for mod in changes.added | changes.modified:
+        if get_manifest(game_path, mod) and verify_mod(game_path, mod):
+            # files were swapped by hand, so the manifest's version no longer says what's installed
+            logging.info(f"{mod} no longer matches its install manifest, reading its version from disk")
+            forget_mod(game_path, mod)
+        try:
+            versions[mod] = get_installed_mod_version(mod, game_path)
+        except (OSError, ValueError) as e:
+            logging.info(f"Unable to read the version of {mod}: {e}")
+            versions[mod] = ""
+    version_index.save()
+    return versions